@@ -7,6 +7,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+    if sys.argv[1:2] == ["test"]:
+        # run the suite (and the benchmarks) under the test profile unless told otherwise
+        os.environ.setdefault("DJANGO_ENV", "test")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -2,7 +2,8 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Subject, Chapter, Topic, TopicStatus, LectureSession, Enrollment
+from .models import Subject, Chapter, Topic, TopicStatus, LectureSession, Enrollment, Job
+from .progress import propagate_topics
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -25,6 +26,22 @@ class TopicAdmin(admin.ModelAdmin):
     list_filter = ('chapter__subject','chapter')
     inlines = [TopicStatusInline]
     ordering = ('chapter','order')
+    actions = ['mark_completed', 'mark_pending']
+
+    def _propagate(self, request, queryset, completed):
+        results = propagate_topics(queryset.select_related('chapter'), completed, updated_by=request.user,
+                                   source='admin')
+        rows = sum(r['rows_written'] for r in results)
+        elapsed = sum(r['elapsed_ms'] for r in results)
+        self.message_user(request, f"Updated {len(results)} topics, {rows} progress rows in {elapsed:.0f} ms")
+
+    @admin.action(description='Mark selected topics completed for all students')
+    def mark_completed(self, request, queryset):
+        self._propagate(request, queryset, True)
+
+    @admin.action(description='Mark selected topics pending for all students')
+    def mark_pending(self, request, queryset):
+        self._propagate(request, queryset, False)
 
 @admin.register(LectureSession)
 class SessionAdmin(admin.ModelAdmin):
@@ -36,3 +53,9 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ('user','subject','role')
     list_filter = ('role','subject')
     search_fields = ('user__username',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id','task','status','attempts','run_after','created_by','finished_at')
+    list_filter = ('status','task')
+    ordering = ('-id',)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "myapp"
+
+    def ready(self):
+        from . import roles  # noqa: F401 - connects the role invalidation handler
+        from . import fragments  # noqa: F401 - connects the chapter tree invalidation handlers
+        from . import tasks  # noqa: F401 - registers the background job tasks
@@ -0,0 +1,114 @@
+"""Attendance analytics over LectureSession: weekly and monthly rollups, a rolling
+weekly average and the attendance rate against the subject's enrolled students.
+
+Each rollup is one grouped query (TruncWeek / TruncMonth) over the subject's sessions,
+which session_subject_date_idx covers; the rolling average is one pass over the weeks.
+Summaries are cached under the subject's rollup version, which every session save or
+delete and every enrollment change moves, so nothing ever has to invalidate them.
+"""
+from collections import deque
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import LectureSession
+
+ROLLING_WEEKS = 4
+CHART_WEEKS = 12  # bars in the chart fragment
+CACHE_TIMEOUT = 24 * 3600
+PERIODS = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def _rate(attendees, sessions, enrolled):
+    """Mean attendance as a percentage of the enrolled students, None without either."""
+    if not (sessions and enrolled):
+        return None
+    return round(attendees / sessions / enrolled * 100, 1)
+
+
+def periods(subject_id, period, enrolled):
+    """One dict per ``period`` ('week' or 'month') with sessions, in date order."""
+    rows = (LectureSession.objects.filter(subject_id=subject_id).order_by()
+            .annotate(start=PERIODS[period]('date')).values('start')
+            .annotate(sessions=Count('id'), total=Sum('attendees'), peak=Max('attendees'))
+            .order_by('start'))
+    return [{
+        'start': row['start'],
+        'sessions': row['sessions'],
+        'attendees': row['total'],
+        'mean': round(row['total'] / row['sessions'], 1),
+        'peak': row['peak'],
+        'rate': _rate(row['total'], row['sessions'], enrolled),
+    } for row in rows]
+
+
+def add_rolling(weeks, enrolled, size=ROLLING_WEEKS):
+    """Set ``rolling_mean``/``rolling_rate`` on each week: per session over the ``size``
+    calendar weeks up to it, so weeks without sessions shorten the window, not pad it."""
+    window = deque()
+    attendees = sessions = 0
+    for week in weeks:
+        window.append(week)
+        attendees += week['attendees']
+        sessions += week['sessions']
+        while window[0]['start'] <= week['start'] - timedelta(weeks=size):
+            dropped = window.popleft()
+            attendees -= dropped['attendees']
+            sessions -= dropped['sessions']
+        week['rolling_mean'] = round(attendees / sessions, 1)
+        week['rolling_rate'] = _rate(attendees, sessions, enrolled)
+    return weeks
+
+
+def summary(subject_id, enrolled):
+    """Attendance totals plus the weekly and monthly series, JSON-ready."""
+    weekly = add_rolling(periods(subject_id, 'week', enrolled), enrolled)
+    monthly = periods(subject_id, 'month', enrolled)
+    sessions = sum(week['sessions'] for week in weekly)
+    attendees = sum(week['attendees'] for week in weekly)
+    for row in weekly + monthly:
+        row['start'] = row['start'].isoformat()
+    return {
+        'subject': subject_id,
+        'enrolled': enrolled,
+        'sessions': sessions,
+        'attendees': attendees,
+        'mean': round(attendees / sessions, 1) if sessions else None,
+        'rate': _rate(attendees, sessions, enrolled),
+        'rolling_weeks': ROLLING_WEEKS,
+        'weekly': weekly,
+        'monthly': monthly,
+    }
+
+
+def cached_summary(rollup):
+    """summary() for ``rollup``'s subject, cached under its version."""
+    key = f'attendance:{rollup.subject_id}:{rollup.version}'
+    data = cache.get(key)
+    if data is None:
+        data = summary(rollup.subject_id, rollup.student_count)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def chart(data, width=600, height=120, weeks=CHART_WEEKS):
+    """Bar geometry for the last ``weeks`` weeks of ``data`` and a polyline for the rolling mean.
+
+    Bars are scaled to the enrolled count (or the busiest week without one), so a
+    full bar means everyone came.
+    """
+    shown = data['weekly'][-weeks:]
+    if not shown:
+        return None
+    top = data['enrolled'] or max(week['peak'] for week in shown) or 1
+    step = width / len(shown)
+    bars, line = [], []
+    for i, week in enumerate(shown):
+        h = round(min(week['mean'] / top, 1) * height, 1)
+        bars.append({'x': round(i * step + step * 0.1, 1), 'y': round(height - h, 1), 'w': round(step * 0.8, 1),
+                     'h': h, 'week': week})
+        y = height - min(week['rolling_mean'] / top, 1) * height
+        line.append(f'{i * step + step / 2:.1f},{y:.1f}')
+    return {'width': width, 'height': height, 'top': top, 'bars': bars, 'line': ' '.join(line)}
@@ -0,0 +1,397 @@
+"""Query-count and latency benchmarks for every route in myapp/urls.py.
+
+Seeds a synthetic institution (subjects x chapters x topics x students) and drives each
+route through the test client, recording query count, p50/p95 latency and peak traced
+memory per view, plus ms per 1,000 renders of the hot partials (measure_partials).
+measure_concurrency drives a running server instead; see the bench_concurrency command.
+Runs entirely on the configured database (SQLite locally), e.g.::
+
+    BENCH_STUDENTS=500 BENCH_OUTPUT=bench.json python manage.py test myapp.tests.ViewBenchmarkTests
+
+Every route must have a SCENARIOS entry; QUERY_BUDGETS / LATENCY_BUDGET_MS are the
+limits ViewBenchmarkTests fails on, as it does on any response whose status isn't the
+one its Route expects.
+"""
+import http.client
+import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template import engines
+from django.utils import timezone
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import partials, rosters
+from .models import (Subject, Chapter, Topic, TopicStatus, LectureSession, Enrollment, TopicProgress,
+                     SubjectProgressRollup, Job)
+from .urls import urlpatterns
+
+DEFAULT_SIZE = {'subjects': 3, 'chapters': 4, 'topics': 5, 'students': 30, 'sessions': 12}
+
+# Max queries per request at DEFAULT_SIZE; a view that goes over has regressed.
+QUERY_BUDGETS = {
+    'home': 3,
+    'logout': 4,
+    'teacher_dashboard': 13,  # 7 once its forecasts are fresh; 6 more to refresh stale ones
+    'student_dashboard': 6,
+    'signup': 2,
+    'login_role': 2,
+    'profile': 5,
+    'teacher_profile': 7,
+    'subject_detail': 9,
+    'progress_partial': 7,
+    'progress_stream': 20,
+    'progress_batch': 6,
+    'add_chapter': 9,
+    'edit_chapter': 7,
+    'delete_chapter': 8,
+    'add_topic': 9,
+    'toggle_topic': 20,
+    'add_session': 7,
+    'import_records': 19,
+    'subject_report': 11,
+    'export_progress': 8,
+    'attendance_analytics': 7,
+    'request_stats': 3,
+    'job_status': 3,
+    'job_result': 6,
+}
+LATENCY_BUDGET_MS = float(os.environ.get('BENCH_P95_BUDGET_MS', 1000))
+
+_serial = count()
+
+
+class Route:
+    """How to exercise one named route: HTTP method, acting role, URL kwargs and POST data,
+    and the status a working view answers with.
+
+    ``kwargs`` and ``data`` are callables receiving the seeded institution and run before
+    every request, outside the timed section (e.g. to create a chapter to delete).
+    """
+
+    def __init__(self, method='get', role='teacher', kwargs=None, data=None, stream=False, status=200):
+        self.method = method
+        self.role = role
+        self.kwargs = kwargs or (lambda inst: {})
+        self.data = data or (lambda inst: None)
+        self.stream = stream
+        self.status = status
+
+
+def _new_chapter(inst):
+    return Chapter.objects.create(subject=inst['subject'], title=f'Bench chapter {next(_serial)}')
+
+
+def _new_job(inst, task='refresh_forecasts', **fields):
+    return Job.objects.create(task=task, created_by=inst['teacher'], **fields)
+
+
+def _report_job(inst):
+    return _new_job(inst, task='render_subject_report', status='succeeded',
+                    result={'subject_id': inst['subject'].pk, 'html': '<div class="card">Bench report</div>'})
+
+
+def _progress_upload(inst):
+    lines = ['student_id,topic_id,status'] + [
+        f"{inst['student'].pk},{topic.pk},in_progress" for topic in inst['topics'][:20]
+    ]
+    return SimpleUploadedFile('progress.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+
+SCENARIOS = {
+    'home': Route(status=302),
+    'logout': Route('post', status=302),
+    'teacher_dashboard': Route(),
+    'student_dashboard': Route(role='student'),
+    'signup': Route(role=None),
+    'login_role': Route(role=None, kwargs=lambda inst: {'role': 'student'}),
+    'profile': Route(),
+    'teacher_profile': Route(kwargs=lambda inst: {'pk': inst['teacher'].pk}),
+    'subject_detail': Route(kwargs=lambda inst: {'pk': inst['subject'].pk}),
+    'progress_partial': Route(role='student', kwargs=lambda inst: {'pk': inst['subject'].pk}),
+    'progress_stream': Route(stream=True),
+    'progress_batch': Route(role='student'),
+    'add_chapter': Route('post', kwargs=lambda inst: {'pk': inst['subject'].pk},
+                         data=lambda inst: {'title': f'Bench chapter {next(_serial)}'}),
+    'edit_chapter': Route('post', kwargs=lambda inst: {'pk': inst['chapter'].pk},
+                          data=lambda inst: {'title': f'Renamed {next(_serial)}'}),
+    'delete_chapter': Route('delete', kwargs=lambda inst: {'pk': _new_chapter(inst).pk}, status=204),
+    'add_topic': Route('post', kwargs=lambda inst: {'pk': inst['chapter'].pk},
+                       data=lambda inst: {'title': f'Bench topic {next(_serial)}'}),
+    'toggle_topic': Route('post', kwargs=lambda inst: {'topic_id': inst['topic'].pk}),
+    'add_session': Route('post', kwargs=lambda inst: {'pk': inst['subject'].pk},
+                         data=lambda inst: {'attendees': 20, 'notes': 'bench'}, status=302),
+    'import_records': Route('post', data=lambda inst: {'kind': 'progress', 'file': _progress_upload(inst)}),
+    'subject_report': Route(kwargs=lambda inst: {'pk': inst['subject'].pk}),
+    'export_progress': Route(kwargs=lambda inst: {'pk': inst['subject'].pk}),
+    'attendance_analytics': Route(kwargs=lambda inst: {'pk': inst['subject'].pk}),
+    'request_stats': Route(role='staff'),
+    'job_status': Route(kwargs=lambda inst: {'pk': _new_job(inst).pk}),
+    'job_result': Route(kwargs=lambda inst: {'pk': _report_job(inst).pk}),
+}
+
+
+def route_names():
+    return {p.name for p in urlpatterns if p.name}
+
+
+def seed_institution(subjects=3, chapters=4, topics=5, students=30, sessions=12):
+    """Create a synthetic institution with bulk inserts; returns handles the scenarios use."""
+    teacher_group, _ = Group.objects.get_or_create(name='Teacher')
+    student_group, _ = Group.objects.get_or_create(name='Student')
+    teacher = User.objects.create_user('bench_teacher', password='bench')
+    teacher.groups.add(teacher_group)
+    student = User.objects.create_user('bench_student', password='bench')
+    student.groups.add(student_group)
+    staff = User.objects.create_user('bench_staff', password='bench', is_staff=True)
+    others = User.objects.bulk_create(User(username=f'bench_student_{i}') for i in range(students - 1))
+    all_students = [student] + others
+    User.groups.through.objects.bulk_create(
+        User.groups.through(user_id=u.pk, group_id=student_group.pk) for u in others
+    )
+
+    subject_objs = Subject.objects.bulk_create(
+        Subject(name=f'Bench subject {i}', class_name='BENCH', teacher=teacher) for i in range(subjects)
+    )
+    Enrollment.objects.bulk_create(
+        Enrollment(user=u, subject=s, role='student') for s in subject_objs for u in all_students
+    )
+    chapter_objs = Chapter.objects.bulk_create(
+        Chapter(subject=s, title=f'Chapter {c}', order=c) for s in subject_objs for c in range(chapters)
+    )
+    topic_objs = Topic.objects.bulk_create(
+        Topic(chapter=ch, title=f'Topic {t}', order=t) for ch in chapter_objs for t in range(topics)
+    )
+    TopicStatus.objects.bulk_create(
+        TopicStatus(topic=t, completed=i % 2 == 0, updated_by=teacher) for i, t in enumerate(topic_objs)
+    )
+    statuses = ('completed', 'in_progress', 'not_started')
+    TopicProgress.objects.bulk_create(
+        (TopicProgress(student=u, topic=t, subject_id=t.chapter.subject_id, status=statuses[(i + j) % 3])
+         for i, t in enumerate(topic_objs) for j, u in enumerate(all_students)),
+        batch_size=2000,
+    )
+    LectureSession.objects.bulk_create(
+        LectureSession(subject=s, attendees=students - i % 5) for s in subject_objs for i in range(sessions)
+    )
+    # bulk inserts skip the signal handlers that keep these current
+    rosters.invalidate_rosters()
+    SubjectProgressRollup.rebuild([s.pk for s in subject_objs])
+    return {
+        'teacher': teacher, 'student': student, 'staff': staff, 'subject': subject_objs[0],
+        'subjects': subject_objs, 'chapter': chapter_objs[0], 'topic': topic_objs[0], 'topics': topic_objs,
+    }
+
+
+def _client(inst, role):
+    client = Client()
+    if role:
+        client.force_login(inst[role])
+    return client
+
+
+def _open_stream(inst, role, path):
+    """Open an SSE stream, read its first event and close it."""
+    async def run():
+        client = AsyncClient()
+        await client.aforce_login(inst[role])
+        response = await client.get(path)
+        events = response.streaming_content.__aiter__()
+        await events.__anext__()
+        await events.aclose()
+        return response
+    return async_to_sync(run)()
+
+
+def _request(inst, name, route):
+    path = reverse(name, kwargs=route.kwargs(inst))
+    if route.stream:
+        query = '&'.join(f's={s.pk}' for s in inst['subjects'])
+        return lambda: _open_stream(inst, route.role, f'{path}?{query}')
+    client = _client(inst, route.role)
+    data = route.data(inst)
+    method = getattr(client, route.method)
+
+    def send():
+        response = method(path, data) if data is not None else method(path)
+        if response.streaming:
+            # streamed bodies run their queries while being consumed
+            b''.join(response.streaming_content)
+        return response
+    return send
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def measure(inst, name, route, repeat=5):
+    timings, queries, status = [], 0, None
+    for _ in range(repeat):
+        send = _request(inst, name, route)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(captured))
+        # keep the first unexpected status, if any
+        if status in (None, route.status):
+            status = response.status_code
+
+    send = _request(inst, name, route)
+    tracemalloc.start()
+    send()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': status,
+        'queries': queries,
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _render_ms_per_1000(render, items, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(items)
+        timings.append((time.perf_counter() - started) * 1000 * 1000 / len(items))
+    return round(_percentile(timings, 50), 2)
+
+
+def partial_samples(topics):
+    """(topics, progress bar contexts) to render: unsaved in-memory objects, no queries."""
+    teacher = User(id=1, username='bench_teacher')
+    now = timezone.now()
+    rows = []
+    for i in range(topics):
+        topic = Topic(id=i + 1, title=f'Topic {i}', order=i)
+        topic.status = TopicStatus(topic=topic, completed=i % 2 == 0, updated_by=teacher, updated_at=now)
+        rows.append(topic)
+    bars = [{'progress_percent': i % 100 + 0.5, 'completed_topics': i % 7, 'in_progress_topics': i % 3,
+             'remaining_topics': i % 5} for i in range(topics)]
+    return rows, bars
+
+
+def measure_partials(topics=1000, repeat=5):
+    """ms per 1,000 renders of the hot partials, template engine vs the partials.py fast path.
+
+    Only rendering is timed (see partial_samples); the template side goes through the
+    configured loaders (cached or not, depending on the settings profile). The numbers
+    are reported, not budgeted: wall-clock comparisons are too noisy to fail a run on.
+    """
+    rows, bars = partial_samples(topics)
+    engine = engines['django']
+    tree = engine.from_string('{% for t in rows %}{% include "myapp/_topic_row.html" %}{% endfor %}')
+    bar = engine.get_template('myapp/_progress_bar.html')
+    return {
+        'topics': topics,
+        'topic_row': {
+            'template_ms': _render_ms_per_1000(lambda items: tree.render({'rows': items, 'is_teacher': True}),
+                                               rows, repeat),
+            'fast_ms': _render_ms_per_1000(lambda items: [partials.topic_row(t, True) for t in items],
+                                           rows, repeat),
+        },
+        'progress_bar': {
+            'template_ms': _render_ms_per_1000(lambda items: [bar.render(ctx) for ctx in items], bars, repeat),
+            'fast_ms': _render_ms_per_1000(lambda items: [partials.progress_bar(ctx) for ctx in items],
+                                           bars, repeat),
+        },
+    }
+
+
+def measure_concurrency(url, cookies=None, clients=50, requests=1000, timeout=30):
+    """Throughput and latency of ``clients`` concurrent pollers sharing ``requests`` GETs of ``url``.
+
+    Each client is a thread with its own keep-alive connection, so this measures how the
+    server copes with many slow-ish pollers, not the test client. Used by the
+    bench_concurrency command to compare the WSGI and ASGI apps on the same view.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in (cookies or {}).items())}
+    per_client = [requests // clients + (i < requests % clients) for i in range(clients)]
+
+    def poll(n):
+        timings, errors = [], 0
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        for _ in range(n):
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        return timings, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(poll, per_client))
+    elapsed = time.perf_counter() - started
+    timings = [t for client_timings, _ in results for t in client_timings]
+    return {
+        'clients': clients,
+        'requests': requests,
+        'errors': sum(errors for _, errors in results),
+        'req_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(_percentile(timings, 50), 2) if timings else None,
+        'p95_ms': round(_percentile(timings, 95), 2) if timings else None,
+    }
+
+
+def size_from_env():
+    return {key: int(os.environ.get(f'BENCH_{key.upper()}', default)) for key, default in DEFAULT_SIZE.items()}
+
+
+def run(size=None, repeat=None):
+    size = size or size_from_env()
+    repeat = repeat or int(os.environ.get('BENCH_REPEAT', 5))
+    inst = seed_institution(**size)
+    views = {name: measure(inst, name, SCENARIOS[name], repeat) for name in sorted(route_names())}
+    return {'size': size, 'repeat': repeat, 'views': views, 'partials': measure_partials(repeat=repeat)}
+
+
+def check_budgets(results):
+    """List of human-readable budget violations (empty when everything is within budget)."""
+    failures = []
+    for name, result in results['views'].items():
+        budget = QUERY_BUDGETS.get(name)
+        if budget is None:
+            failures.append(f'{name}: no query budget')
+        elif result['queries'] > budget:
+            failures.append(f"{name}: {result['queries']} queries > budget {budget}")
+        if result['p95_ms'] > LATENCY_BUDGET_MS:
+            failures.append(f"{name}: p95 {result['p95_ms']} ms > budget {LATENCY_BUDGET_MS} ms")
+        expected = SCENARIOS[name].status if name in SCENARIOS else 200
+        if result['status'] != expected:
+            failures.append(f"{name}: HTTP {result['status']}, expected {expected}")
+    return failures
+
+
+def write_results(results, path=None):
+    path = path or os.environ.get('BENCH_OUTPUT')
+    if path:
+        with open(path, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+    return path
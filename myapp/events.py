@@ -0,0 +1,166 @@
+"""Append-only log of progress writes, compacted into TopicProgress and daily snapshots.
+
+Every progress write appends ProgressEvent rows in its own transaction, one bulk insert
+per batch: a topic toggle appends one class-wide event (``student`` None), an import
+one event per row. Events are never updated; ProgressCompaction keeps the id of the
+last one compaction has read.
+
+compact() reads the log in id order, ``batch_size`` events per transaction, and
+
+- upserts the TopicProgress rows of the events written with ``applied=False``; the
+  latest event per student and topic wins, class-wide ones fan out to the roster then,
+  and a row written after the event (an import, an admin edit) is left alone,
+- writes today's SubjectProgressSnapshot for every subject the batch touched, from the
+  rollup counts and the number of class-level topics completed.
+
+With ``PROGRESS_FANOUT = 'deferred'`` topic toggles leave the per-student rows to
+compaction, so a toggle writes two rows instead of one per student. Each toggle then
+queues a compaction job (myapp/jobs.py) and students see it once a worker has run that,
+or the next ``manage.py compact_progress``. A day without events gets no snapshot,
+the previous one still holds.
+"""
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import rosters
+from .models import (ProgressEvent, ProgressCompaction, SubjectProgressSnapshot, SubjectProgressRollup,
+                     TopicProgress, TopicStatus)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+INSERT_BATCH_SIZE = 1000
+# ids are handed out before commit, so a younger event can commit before an older one;
+# leave the last few seconds of the log alone so the cursor never skips over one
+SETTLE_SECONDS = 10
+CURSOR = 'progress'
+SNAPSHOT_FIELDS = ('topic_count', 'topics_completed', 'completed_count', 'in_progress_count',
+                   'not_started_count', 'student_count', 'event_count')
+
+
+def deferred_fanout():
+    return getattr(settings, 'PROGRESS_FANOUT', 'sync') == 'deferred'
+
+
+def append(events):
+    """Insert unsaved ProgressEvents, one bulk insert per INSERT_BATCH_SIZE."""
+    ProgressEvent.objects.bulk_create(events, batch_size=INSERT_BATCH_SIZE)
+
+
+def _settled(events, cutoff):
+    """The leading run of ``events`` created before ``cutoff``."""
+    for i, event in enumerate(events):
+        if event.created_at >= cutoff:
+            return events[:i]
+    return events
+
+
+def _fold(events):
+    """{(student_id, topic_id): event} for the latest event not applied yet per pair."""
+    latest = {}
+    roster = {}  # class-wide events fan out to the current roster, read once per subject and batch
+    for event in events:
+        if not event.applied:
+            if event.student_id:
+                student_ids = [event.student_id]
+            else:
+                if event.subject_id not in roster:
+                    roster[event.subject_id] = rosters.student_ids(event.subject_id, fresh=True)
+                student_ids = roster[event.subject_id]
+            for student_id in student_ids:
+                latest[(student_id, event.topic_id)] = event
+    return latest
+
+
+def _drop_overwritten(latest):
+    """Drop the pairs whose progress row was written after their event, e.g. by an import."""
+    if not latest:
+        return latest
+    oldest = min(event.created_at for event in latest.values())
+    newer = (TopicProgress.objects.filter(topic__in={topic_id for _, topic_id in latest}, updated_at__gt=oldest)
+             .values_list('student', 'topic', 'updated_at'))
+    for student_id, topic_id, updated_at in newer.iterator():
+        event = latest.get((student_id, topic_id))
+        if event is not None and updated_at > event.created_at:
+            del latest[(student_id, topic_id)]
+    return latest
+
+
+def _snapshot(event_counts, today):
+    subject_ids = list(event_counts)
+    rollups = SubjectProgressRollup.objects.filter(subject__in=subject_ids).values(
+        'subject', *SubjectProgressRollup.COUNT_FIELDS)
+    completed = dict(TopicStatus.objects.filter(completed=True, topic__chapter__subject__in=subject_ids)
+                     .order_by().values('topic__chapter__subject').annotate(n=Count('id'))
+                     .values_list('topic__chapter__subject', 'n'))
+    earlier = dict(SubjectProgressSnapshot.objects.filter(subject__in=subject_ids, day=today)
+                   .values_list('subject', 'event_count'))
+    snapshots = []
+    for row in rollups:
+        subject_id = row.pop('subject')
+        snapshots.append(SubjectProgressSnapshot(
+            subject_id=subject_id, day=today, topics_completed=completed.get(subject_id, 0),
+            event_count=earlier.get(subject_id, 0) + event_counts[subject_id], **row,
+        ))
+    SubjectProgressSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=['subject', 'day'], update_fields=SNAPSHOT_FIELDS,
+    )
+    return len(snapshots)
+
+
+def _compact_batch(batch_size, cutoff, today):
+    with transaction.atomic():
+        cursor, _ = ProgressCompaction.objects.select_for_update().get_or_create(name=CURSOR)
+        events = _settled(list(ProgressEvent.objects.filter(pk__gt=cursor.last_event_id)
+                               .order_by('pk')[:batch_size]), cutoff)
+        if not events:
+            return 0, 0, set()
+        latest = _drop_overwritten(_fold(events))
+        now = timezone.now()
+        TopicProgress.objects.bulk_create(
+            [TopicProgress(student_id=student_id, topic_id=topic_id, subject_id=event.subject_id,
+                           status=event.status, updated_at=now)
+             for (student_id, topic_id), event in latest.items()],
+            batch_size=INSERT_BATCH_SIZE,
+            update_conflicts=True, unique_fields=['student', 'topic'], update_fields=['status', 'updated_at'],
+        )
+        applied = sorted({event.subject_id for event in latest.values()})
+        if applied:
+            # bulk writes skip the rollup signal handlers
+            SubjectProgressRollup.rebuild(applied)
+        event_counts = Counter(event.subject_id for event in events)
+        _snapshot(event_counts, today)
+        cursor.last_event_id = events[-1].pk
+        cursor.save()
+    return len(events), len(latest), set(event_counts)
+
+
+def compact(batch_size=BATCH_SIZE, settle=SETTLE_SECONDS, today=None):
+    """Fold in every settled event appended since the last run; returns a dict of counts."""
+    started = time.perf_counter()
+    today = today or timezone.localdate()
+    cutoff = timezone.now() - timedelta(seconds=settle)
+    events = rows = 0
+    subjects = set()
+    while True:
+        read, written, touched = _compact_batch(batch_size, cutoff, today)
+        events += read
+        rows += written
+        subjects |= touched
+        if read < batch_size:
+            break
+    result = {
+        'events': events,
+        'rows_written': rows,
+        'subjects': len(subjects),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info('compact_progress %s', result)
+    return result
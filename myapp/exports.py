@@ -0,0 +1,76 @@
+"""Streaming student x topic progress matrices (CSV and JSON lines).
+
+The matrix is pivoted on the fly: enrolled students and their TopicProgress rows are
+read with ``.iterator()`` in the same student order and merged, so only one student's
+row is held in memory at a time regardless of class size.
+"""
+import csv
+import json
+
+from .models import Enrollment, Topic, TopicProgress
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+MISSING_STATUS = 'not_started'
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def matrix_topics(subject):
+    """The matrix columns: the subject's topics in syllabus order."""
+    return list(Topic.objects.filter(chapter__subject=subject)
+                .order_by('chapter__order', 'chapter_id', 'order', 'id')
+                .values('id', 'title', 'chapter__title'))
+
+
+def iter_matrix(subject, topics, chunk_size=CHUNK_SIZE):
+    """Yield ``(username, statuses)`` per enrolled student, statuses aligned with ``topics``."""
+    columns = {t['id']: i for i, t in enumerate(topics)}
+    students = (Enrollment.objects.filter(subject=subject, role='student')
+                .order_by('user_id').values_list('user_id', 'user__username')
+                .iterator(chunk_size=chunk_size))
+    progress = (TopicProgress.objects.filter(subject=subject)
+                .order_by('student_id').values_list('student_id', 'topic_id', 'status')
+                .iterator(chunk_size=chunk_size))
+    pending = next(progress, None)
+    for user_id, username in students:
+        statuses = [MISSING_STATUS] * len(topics)
+        # skip rows of students who are no longer enrolled
+        while pending is not None and pending[0] < user_id:
+            pending = next(progress, None)
+        while pending is not None and pending[0] == user_id:
+            column = columns.get(pending[1])
+            if column is not None:
+                statuses[column] = pending[2]
+            pending = next(progress, None)
+        yield username, statuses
+
+
+def iter_csv(subject, chunk_size=CHUNK_SIZE):
+    topics = matrix_topics(subject)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['student'] + [f"{t['chapter__title']} / {t['title']}" for t in topics])
+    for username, statuses in iter_matrix(subject, topics, chunk_size):
+        yield writer.writerow([username] + statuses)
+
+
+def iter_jsonl(subject, chunk_size=CHUNK_SIZE):
+    """A header line describing the columns, then one ``{"student", "statuses"}`` line per student."""
+    topics = matrix_topics(subject)
+    header = {'subject': subject.name, 'topics': [
+        {'id': t['id'], 'chapter': t['chapter__title'], 'title': t['title']} for t in topics
+    ]}
+    yield json.dumps(header) + '\n'
+    for username, statuses in iter_matrix(subject, topics, chunk_size):
+        yield json.dumps({'student': username, 'statuses': statuses}) + '\n'
+
+
+def iter_export(subject, fmt, chunk_size=CHUNK_SIZE):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}')
+    return iter_csv(subject, chunk_size) if fmt == 'csv' else iter_jsonl(subject, chunk_size)
@@ -0,0 +1,153 @@
+"""Syllabus pace forecasts, precomputed per subject into SubjectForecast rows.
+
+The topic pace is a least-squares line through the number of completed topics over
+time, anchored at zero on the subject's start date. The points come from the daily
+SubjectProgressSnapshots (myapp/events.py) once a subject has some, which also see
+topics marked pending again; before that, from each completed TopicStatus's
+``updated_at``. The lecture pace is the number of LectureSessions held since the start.
+Together they project when the syllabus will be finished and how many lectures that
+takes, compared with ``end_date`` and ``planned_lectures``.
+
+compute() covers any number of subjects with five set-based queries and one pass over
+the completed statuses and snapshots. refresh() only recomputes forecasts whose subject's rollup
+version moved or that were computed on an earlier day. The teacher dashboard reads
+the stored rows; ``manage.py refresh_forecasts`` refreshes them all, e.g. from cron.
+"""
+import math
+from datetime import timedelta
+from itertools import groupby
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Subject, Topic, TopicStatus, LectureSession, SubjectForecast, SubjectProgressSnapshot
+
+FORECAST_FIELDS = ('topics_per_week', 'lectures_per_week', 'projected_finish', 'projected_lectures', 'days_late',
+                   'alert', 'source_version', 'computed_on')
+
+
+def _slope(points):
+    """Least-squares slope of y over x; 0 when x doesn't vary."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    if not sxx:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+
+
+def _completion_days(subject_ids):
+    """{subject_id: [completion date, ...] in order} for the completed topics."""
+    rows = (TopicStatus.objects.filter(completed=True, topic__chapter__subject__in=subject_ids)
+            .order_by('topic__chapter__subject', 'updated_at')
+            .values_list('topic__chapter__subject', 'updated_at'))
+    return {subject_id: [timezone.localdate(updated_at) for _, updated_at in group]
+            for subject_id, group in groupby(rows.iterator(), key=lambda row: row[0])}
+
+
+def _snapshot_history(subject_ids):
+    """{subject_id: [(day, topics completed), ...] by day} from the daily snapshots."""
+    rows = (SubjectProgressSnapshot.objects.filter(subject__in=subject_ids)
+            .order_by('subject', 'day').values_list('subject', 'day', 'topics_completed'))
+    return {subject_id: [(day, n) for _, day, n in group]
+            for subject_id, group in groupby(rows.iterator(), key=lambda row: row[0])}
+
+
+def _forecast(subject, topic_count, done_days, lecture_count, today, history=()):
+    start = subject['start_date']
+    completed = len(done_days)
+    remaining = max(topic_count - completed, 0)
+    elapsed_days = max((today - start).days, 1)
+
+    per_day = 0.0
+    if completed:
+        # cumulative completions over days since the start, anchored at (0, 0); all on
+        # the start day leaves nothing to fit, so fall back to the average rate
+        if history:
+            points = [(max((day - start).days, 0), n) for day, n in history if day < today]
+            points = [(0, 0)] + points + [(elapsed_days, completed)]
+        else:
+            points = [(max((day - start).days, 0), k) for k, day in enumerate(done_days, 1)]
+            points = [(0, 0)] + points
+        # un-completions can tilt the snapshot line downwards; that's no pace to project from
+        per_day = max(_slope(points), 0) or completed / elapsed_days
+
+    projected_finish = projected_lectures = days_late = None
+    if topic_count and not remaining:
+        projected_finish = done_days[-1]
+        projected_lectures = lecture_count
+    elif remaining and per_day:
+        projected_finish = today + timedelta(days=math.ceil(remaining / per_day))
+        if lecture_count:
+            projected_lectures = lecture_count + math.ceil(remaining / (completed / lecture_count))
+    if projected_finish and subject['end_date']:
+        days_late = (projected_finish - subject['end_date']).days
+
+    name = subject['name']
+    alert = ''
+    if remaining and not completed and subject['end_date']:
+        alert = f"{name}: no topics completed yet, {remaining} left before {subject['end_date']:%b %d}."
+    elif remaining and days_late is not None and days_late > 0:
+        alert = (f"{name}: at {per_day * 7:.1f} topics/week the syllabus finishes {projected_finish:%b %d}, "
+                 f"{days_late} days after the end date.")
+    elif remaining and projected_lectures and projected_lectures > subject['planned_lectures']:
+        alert = (f"{name}: needs ~{projected_lectures} lectures at the current pace, "
+                 f"{subject['planned_lectures']} planned.")
+    return {
+        'topics_per_week': round(per_day * 7, 2),
+        'lectures_per_week': round(lecture_count / elapsed_days * 7, 2),
+        'projected_finish': projected_finish,
+        'projected_lectures': projected_lectures,
+        'days_late': days_late,
+        'alert': alert[:250],
+        'source_version': subject['version'],
+        'computed_on': today,
+    }
+
+
+def compute(subject_ids, today=None):
+    """Forecast field values for ``subject_ids``: {subject_id: {field: value}}."""
+    today = today or timezone.localdate()
+    subjects = (Subject.objects.filter(pk__in=subject_ids)
+                .values('pk', 'name', 'start_date', 'end_date', 'planned_lectures',
+                        version=Coalesce('rollup__version', 0)))
+    topic_counts = dict(Topic.objects.filter(chapter__subject__in=subject_ids).order_by()
+                        .values('chapter__subject').annotate(n=Count('id')).values_list('chapter__subject', 'n'))
+    sessions = dict(LectureSession.objects.filter(subject__in=subject_ids).order_by()
+                    .values('subject').annotate(n=Count('id')).values_list('subject', 'n'))
+    done = _completion_days(subject_ids)
+    history = _snapshot_history(subject_ids)
+    return {
+        s['pk']: _forecast(s, topic_counts.get(s['pk'], 0), done.get(s['pk'], []), sessions.get(s['pk'], 0), today,
+                           history.get(s['pk'], ()))
+        for s in subjects
+    }
+
+
+def stale(subjects, today=None):
+    """The subjects in ``subjects`` (a Subject queryset) whose forecast is missing or out of date."""
+    today = today or timezone.localdate()
+    return subjects.filter(
+        Q(forecast__isnull=True)
+        | Q(forecast__computed_on__lt=today)
+        | ~Q(forecast__source_version=Coalesce(F('rollup__version'), 0))
+    )
+
+
+def refresh(subjects=None, force=False, today=None):
+    """Recompute the stale forecasts among ``subjects`` (every subject when None); returns how many."""
+    today = today or timezone.localdate()
+    subjects = Subject.objects.all() if subjects is None else subjects
+    if not force:
+        subjects = stale(subjects, today)
+    subject_ids = list(subjects.order_by().values_list('pk', flat=True))
+    if not subject_ids:
+        return 0
+    values = compute(subject_ids, today)
+    SubjectForecast.objects.bulk_create(
+        [SubjectForecast(subject_id=pk, **fields) for pk, fields in values.items()],
+        update_conflicts=True, unique_fields=['subject'], update_fields=FORECAST_FIELDS,
+    )
+    return len(values)
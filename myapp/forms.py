@@ -8,6 +8,12 @@ ROLE_CHOICES = (
 )
 
 
+def class_choices():
+    from .models import Subject
+    names = Subject.objects.order_by('class_name').values_list('class_name', flat=True).distinct()
+    return [('', '---------')] + [(name, name) for name in names]
+
+
 class SignupForm(UserCreationForm):
     email = forms.EmailField(
         required=True,
@@ -26,10 +32,16 @@ class SignupForm(UserCreationForm):
         widget=forms.Select(attrs={'class': 'form-input'}),
         help_text='Choose your role in the system.'
     )
+    class_name = forms.ChoiceField(
+        choices=class_choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-input'}),
+        help_text='Students are enrolled in every subject of their class.'
+    )
 
     class Meta:
         model = User
-        fields = ('username', 'email', 'full_name', 'role', 'password1', 'password2')
+        fields = ('username', 'email', 'full_name', 'role', 'class_name', 'password1', 'password2')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -52,6 +64,14 @@ class SignupForm(UserCreationForm):
             raise forms.ValidationError('This email address is already in use. Please use a different email.')
         return email
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # a student without a class would land on an empty dashboard
+        if cleaned_data.get('role') == 'student' and not cleaned_data.get('class_name') \
+                and any(value for value, _ in self.fields['class_name'].choices):
+            self.add_error('class_name', 'Choose your class.')
+        return cleaned_data
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.email = self.cleaned_data['email']
@@ -62,6 +82,8 @@ class SignupForm(UserCreationForm):
             if role:
                 grp, _ = Group.objects.get_or_create(name=role.capitalize())
                 user.groups.add(grp)
+            if role == 'student' and self.cleaned_data.get('class_name'):
+                self._enroll(user, self.cleaned_data['class_name'])
             # save profile full_name if provided
             full_name = self.cleaned_data.get('full_name')
             if full_name:
@@ -72,6 +94,17 @@ class SignupForm(UserCreationForm):
                     pass
         return user
 
+    @staticmethod
+    def _enroll(user, class_name):
+        from . import rosters
+        from .models import Enrollment, Subject, SubjectProgressRollup
+        subject_ids = list(Subject.objects.filter(class_name=class_name).values_list('pk', flat=True))
+        Enrollment.objects.bulk_create(
+            [Enrollment(user=user, subject_id=pk, role='student') for pk in subject_ids], ignore_conflicts=True)
+        # bulk inserts skip the roster and rollup signal handlers
+        rosters.invalidate_rosters()
+        SubjectProgressRollup.rebuild(subject_ids)
+
 
 class ProfileForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,42 @@
+"""Cached subject_detail chapter/topic tree, keyed by the subject's rollup version.
+
+SubjectProgressRollup.version lives in the database, so every process agrees on it,
+and every Chapter, Topic and TopicStatus save or delete moves it (models.py), as do
+topic toggles and progress compaction. That covers add_chapter, edit_chapter,
+delete_chapter, add_topic and toggle_topic as well as admin edits. Old fragments are
+never deleted: nothing reads them again once the version has moved.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Chapter, SubjectProgressRollup, Topic
+
+# bounds how stale the rows' "updated ... ago" text can get between edits
+TREE_TIMEOUT = 300
+
+
+def with_topics(chapters):
+    """Prefetch what _chapter_row.html shows: topics, their status and who last changed it."""
+    return chapters.prefetch_related(
+        Prefetch('topics', queryset=Topic.objects.select_related('status__updated_by'))
+    )
+
+
+def chapter_tree(subject, is_teacher):
+    """Rendered chapters of ``subject``; the markup only varies by teacher/student view.
+
+    Load the subject with select_related('rollup') to skip the version lookup.
+    """
+    # the version is read before the chapters, so a fragment is never older than its key
+    version = SubjectProgressRollup.for_subject(subject).version
+    key = f'tree:{subject.pk}:{version}:{int(bool(is_teacher))}'
+    html = cache.get(key)
+    if html is None:
+        chapters = with_topics(Chapter.objects.filter(subject=subject))
+        html = render_to_string('myapp/_chapter_tree.html', {
+            'subject': subject, 'chapters': chapters, 'is_teacher': is_teacher,
+        })
+        cache.set(key, str(html), TREE_TIMEOUT)
+    return mark_safe(html)
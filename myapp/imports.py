@@ -0,0 +1,219 @@
+"""Streaming bulk import of TopicProgress and LectureSession records from CSV or JSON lines.
+
+Records are validated against in-memory indexes of the allowed topics, subjects,
+enrollments and sessions, loaded once up front, so checking a row costs no query.
+Valid rows are upserted in batches, one transaction per batch; progress batches also
+append one ProgressEvent per row to the event log (myapp/events.py). Rejected rows are
+counted and reported with their line number instead of aborting the import.
+
+Progress columns: ``topic_id``, ``status`` and either ``student_id`` or ``student`` (username).
+Session columns: ``subject_id``, ``date`` (YYYY-MM-DD), ``attendees``, ``notes`` and an
+optional ``id``. Rows with an id update that session; rows without one are inserted.
+"""
+import csv
+import json
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+from .models import (PROGRESS_STATUS_CHOICES, Topic, Subject, Enrollment, LectureSession, TopicProgress,
+                     SubjectProgressRollup, ProgressEvent)
+
+IMPORT_KINDS = ('progress', 'sessions')
+IMPORT_FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 2000
+MAX_REPORTED_REJECTS = 100
+
+_STATUSES = {value for value, _ in PROGRESS_STATUS_CHOICES}
+
+
+class RejectedRow(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+        self.rejects = []  # first MAX_REPORTED_REJECTS (line, reason) pairs
+        self.subject_ids = set()
+        self.elapsed = 0.0
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((line, reason))
+
+    @property
+    def rows_per_second(self):
+        return round(self.read / self.elapsed) if self.elapsed else 0
+
+    def as_dict(self):
+        return {
+            'kind': self.kind, 'read': self.read, 'written': self.written, 'rejected': self.rejected,
+            'rejects': [{'line': line, 'reason': reason} for line, reason in self.rejects],
+            'elapsed_s': round(self.elapsed, 3), 'rows_per_second': self.rows_per_second,
+        }
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """Yield ``(line_number, dict)`` from a text stream; malformed lines yield an error string."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_number, f'invalid JSON: {exc}'
+            continue
+        yield line_number, record if isinstance(record, dict) else 'expected a JSON object'
+
+
+def _int(record, field):
+    try:
+        return int(record[field])
+    except KeyError:
+        raise RejectedRow(f'missing {field}')
+    except (TypeError, ValueError):
+        raise RejectedRow(f'{field} is not an integer')
+
+
+class ProgressImporter:
+    """Validates progress rows and upserts them on (student, topic)."""
+    kind = 'progress'
+
+    def __init__(self, subjects):
+        self.topics = dict(Topic.objects.filter(chapter__subject__in=subjects)
+                           .values_list('pk', 'chapter__subject_id'))
+        self.enrolled = set(Enrollment.objects.filter(subject__in=subjects, role='student')
+                            .values_list('user_id', 'subject_id'))
+        student_ids = {user_id for user_id, _ in self.enrolled}
+        self.usernames = dict(User.objects.filter(pk__in=student_ids).values_list('username', 'pk'))
+
+    def clean(self, record):
+        if record.get('student_id') not in (None, ''):
+            student_id = _int(record, 'student_id')
+        elif record.get('student') in self.usernames:
+            student_id = self.usernames[record['student']]
+        else:
+            raise RejectedRow(f"unknown student {record.get('student')!r}")
+        topic_id = _int(record, 'topic_id')
+        subject_id = self.topics.get(topic_id)
+        if subject_id is None:
+            raise RejectedRow(f'unknown topic {topic_id}')
+        if (student_id, subject_id) not in self.enrolled:
+            raise RejectedRow(f'student {student_id} is not enrolled in subject {subject_id}')
+        status = record.get('status')
+        if status not in _STATUSES:
+            raise RejectedRow(f'invalid status {status!r}')
+        return TopicProgress(student_id=student_id, topic_id=topic_id, subject_id=subject_id, status=status)
+
+    def write(self, objs):
+        # the last row wins when a batch repeats a (student, topic) pair
+        objs = list({(o.student_id, o.topic_id): o for o in objs}.values())
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        TopicProgress.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=['student', 'topic'], update_fields=['status', 'updated_at'],
+        )
+        events.append([ProgressEvent(subject_id=o.subject_id, topic_id=o.topic_id, student_id=o.student_id,
+                                     status=o.status, source='import', created_at=now) for o in objs])
+        return len(objs)
+
+    def finish(self, subject_ids):
+        # bulk writes skip the rollup signal handlers
+        SubjectProgressRollup.rebuild(subject_ids)
+
+
+class SessionImporter:
+    """Validates lecture sessions; rows with an ``id`` update, the rest insert."""
+    kind = 'sessions'
+
+    def __init__(self, subjects):
+        self.subjects = set(Subject.objects.filter(pk__in=subjects).values_list('pk', flat=True))
+        self.sessions = dict(LectureSession.objects.filter(subject__in=self.subjects)
+                             .values_list('pk', 'subject_id'))
+
+    def clean(self, record):
+        subject_id = _int(record, 'subject_id')
+        if subject_id not in self.subjects:
+            raise RejectedRow(f'unknown subject {subject_id}')
+        session = LectureSession(subject_id=subject_id, notes=(record.get('notes') or '')[:250])
+        if record.get('id') not in (None, ''):
+            session.pk = _int(record, 'id')
+            if self.sessions.get(session.pk) != subject_id:
+                raise RejectedRow(f'unknown session {session.pk} for subject {subject_id}')
+        try:
+            session.date = date.fromisoformat(str(record['date']))
+        except KeyError:
+            raise RejectedRow('missing date')
+        except ValueError:
+            raise RejectedRow(f"invalid date {record['date']!r}")
+        session.attendees = _int(record, 'attendees') if record.get('attendees') not in (None, '') else 0
+        if session.attendees < 0:
+            raise RejectedRow('attendees is negative')
+        return session
+
+    def write(self, objs):
+        updates = {o.pk: o for o in objs if o.pk is not None}
+        LectureSession.objects.bulk_update(updates.values(), ['date', 'attendees', 'notes'])
+        created = LectureSession.objects.bulk_create([o for o in objs if o.pk is None])
+        return len(updates) + len(created)
+
+    def finish(self, subject_ids):
+        for subject_id in subject_ids:
+            SubjectProgressRollup.touch(subject_id)
+
+
+IMPORTERS = {'progress': ProgressImporter, 'sessions': SessionImporter}
+
+
+def import_records(stream, kind, fmt='csv', subjects=None, batch_size=BATCH_SIZE):
+    """Import records of ``kind`` from ``stream``, restricted to ``subjects`` (all when None)."""
+    started = time.perf_counter()
+    if subjects is None:
+        subjects = Subject.objects.all()
+    importer = IMPORTERS[kind](subjects)
+    report = ImportReport(kind)
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            report.written += importer.write(batch)
+            report.subject_ids.update(o.subject_id for o in batch)
+        batch.clear()
+
+    for line, record in read_records(stream, fmt):
+        report.read += 1
+        if isinstance(record, str):
+            report.reject(line, record)
+            continue
+        try:
+            batch.append(importer.clean(record))
+        except RejectedRow as exc:
+            report.reject(line, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if report.subject_ids:
+        importer.finish(sorted(report.subject_ids))
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,186 @@
+"""A small database-backed job queue: Job rows, worked off by ``manage.py run_worker``.
+
+enqueue() inserts a queued Job for a task registered with @task (myapp/tasks.py).
+Workers claim the next due job with a conditional UPDATE that only matches while it is
+still queued, so any number of worker processes and threads can share the table, on
+SQLite as on PostgreSQL, without holding a lock while the job runs. A failed attempt is
+retried after ``BACKOFF_SECONDS * 2 ** (attempt - 1)`` until the task's max_attempts.
+While a job runs, a heartbeat thread renews its ``heartbeat_at`` every HEARTBEAT_SECONDS,
+however long the task takes; a running job whose heartbeat is older than LEASE_SECONDS
+is taken to have died with its worker and is queued again. Tasks get the job's ``args``
+as keyword arguments and return something JSON-serializable, stored as its ``result``.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_SECONDS = 5
+HEARTBEAT_SECONDS = 30
+LEASE_SECONDS = 120  # several missed heartbeats
+POLL_SECONDS = 1.0
+CLAIM_CANDIDATES = 10  # due jobs tried per claim before giving up to other workers
+MAX_ERROR_LENGTH = 4000
+
+TASKS = {}  # name -> (function, max_attempts)
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+def task(name=None, max_attempts=3):
+    """Register the decorated function as a job task under ``name`` (its own name by default)."""
+    def register(func):
+        TASKS[name or func.__name__] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(task_name, args=None, user=None, delay=0, unique=False):
+    """Queue a job for ``task_name``, due in ``delay`` seconds; returns it.
+
+    With ``unique`` a job for the same task and args that is still queued is returned
+    instead of adding another, for work where one pending run covers every request.
+    """
+    if task_name not in TASKS:
+        raise UnknownTask(f'unknown task {task_name!r}')
+    args = args or {}
+    if unique:
+        existing = Job.objects.filter(task=task_name, args=args, status='queued').order_by('pk').first()
+        if existing is not None:
+            return existing
+    return Job.objects.create(task=task_name, args=args, created_by=user, max_attempts=TASKS[task_name][1],
+                              run_after=timezone.now() + timedelta(seconds=delay))
+
+
+def claim(worker):
+    """Mark the next due job running for ``worker`` and return it; None when nothing is due."""
+    now = timezone.now()
+    due = (Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+           .values_list('pk', flat=True)[:CLAIM_CANDIDATES])
+    for pk in due:
+        # another worker may have claimed it since; then the UPDATE matches nothing
+        if Job.objects.filter(pk=pk, status='queued').update(
+                status='running', worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def heartbeat(job):
+    """Renew ``job``'s lease; False once it is no longer running on this worker."""
+    return bool(Job.objects.filter(pk=job.pk, status='running', worker=job.worker)
+                .update(heartbeat_at=timezone.now()))
+
+
+@contextmanager
+def _heartbeats(job):
+    """Beat for ``job`` on a thread of its own while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                if not heartbeat(job):
+                    logger.warning('job %s', {'id': job.pk, 'task': job.task, 'lease': 'lost'})
+                    return
+        finally:
+            connection.close()  # this thread's own connection
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def requeue_lost(now=None):
+    """Queue again (or fail, when out of attempts) running jobs without a heartbeat for LEASE_SECONDS."""
+    now = now or timezone.now()
+    lost = Job.objects.filter(status='running', heartbeat_at__lt=now - timedelta(seconds=LEASE_SECONDS))
+    failed = lost.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='worker lost', finished_at=now)
+    requeued = lost.update(status='queued', worker='', run_after=now)
+    return requeued + failed
+
+
+def run(job):
+    """Run a claimed job and record how it went; returns the job."""
+    func, _ = TASKS.get(job.task, (None, 0))
+    now = timezone.now
+    try:
+        if func is None:
+            raise UnknownTask(f'unknown task {job.task!r}')
+        with _heartbeats(job):
+            result = func(**job.args)
+    except Exception:
+        job.error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        if func is not None and job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = now() + timedelta(seconds=BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = now()
+    else:
+        job.status, job.result, job.error, job.finished_at = 'succeeded', result, '', now()
+    # only while still ours: a job that missed its heartbeats may be running elsewhere by now
+    if not Job.objects.filter(pk=job.pk, status='running', worker=job.worker).update(
+            status=job.status, result=job.result, error=job.error, run_after=job.run_after,
+            finished_at=job.finished_at):
+        logger.warning('job %s', {'id': job.pk, 'task': job.task, 'lease': 'lost', 'dropped': job.status})
+    logger.info('job %s', {
+        'id': job.pk, 'task': job.task, 'status': job.status, 'attempt': job.attempts,
+        'elapsed_ms': round((now() - job.started_at).total_seconds() * 1000, 2),
+    })
+    return job
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(threads=1, once=False, poll=POLL_SECONDS, stop=None, name=None):
+    """Run jobs on ``threads`` threads until ``stop`` (a threading.Event) is set; with
+    ``once``, return as soon as nothing is due. Returns how many jobs were run."""
+    stop = stop or threading.Event()
+    name = name or worker_name()
+
+    def loop(n):
+        done = 0
+        while not stop.is_set():
+            job = claim(f'{name}/{n}')
+            if job is not None:
+                run(job)
+                done += 1
+            elif once:
+                break
+            else:
+                requeue_lost()
+                stop.wait(poll)
+        return done
+
+    def threaded(n):
+        try:
+            return loop(n)
+        finally:
+            connection.close()  # this thread's own connection
+
+    requeue_lost()
+    if threads == 1:
+        return loop(0)
+    with ThreadPoolExecutor(threads, thread_name_prefix='job-worker') as pool:
+        return sum(pool.map(threaded, range(threads)))
@@ -0,0 +1,115 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from myapp.benchmarks import measure_concurrency
+from myapp.models import Subject
+
+SERVERS = {
+    'wsgi': lambda host, port, workers: [
+        sys.executable, '-m', 'gunicorn', 'myproject.wsgi:application',
+        '--bind', f'{host}:{port}', '--workers', str(workers), '--log-level', 'warning',
+    ],
+    'asgi': lambda host, port, workers: [
+        sys.executable, '-m', 'uvicorn', 'myproject.asgi:application',
+        '--host', host, '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+    ],
+}
+VIEWS = ('progress_partial', 'subject_detail', 'teacher_dashboard', 'student_dashboard')
+
+
+class Command(BaseCommand):
+    help = ('Compare the WSGI (gunicorn) and ASGI (uvicorn) apps under many concurrent pollers '
+            'of one read-only view, against the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', type=int, help='Subject id. Defaults to the first one with a teacher.')
+        parser.add_argument('--user', help='Username to poll as. Defaults to the subject\'s teacher.')
+        parser.add_argument('--view', choices=VIEWS, default='progress_partial')
+        parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated: wsgi, asgi.')
+        parser.add_argument('--clients', default='10,50,200', help='Comma-separated concurrency levels.')
+        parser.add_argument('--requests', type=int, default=2000, help='GETs per concurrency level.')
+        parser.add_argument('--workers', type=int, default=2, help='Server processes for both servers.')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', '-o', help='Also write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        servers = [name for name in options['servers'].split(',') if name]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown server(s): {', '.join(sorted(unknown))}")
+        try:
+            clients = [int(n) for n in options['clients'].split(',') if n]
+        except ValueError:
+            raise CommandError('--clients takes comma-separated integers')
+
+        if options['subject']:
+            subject = Subject.objects.filter(pk=options['subject']).first()
+        else:
+            subject = Subject.objects.exclude(teacher=None).order_by('pk').first()
+        if subject is None:
+            raise CommandError('No such subject; seed some data first (seed_demo or seed_scale)')
+        try:
+            user = User.objects.get(username=options['user']) if options['user'] else subject.teacher
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+        if user is None:
+            raise CommandError(f'Subject {subject.pk} has no teacher; pass --user')
+        path = reverse(options['view'], args=[subject.pk] if options['view'] in VIEWS[:2] else [])
+
+        # a real session row, so every server process can authenticate the pollers
+        client = Client()
+        client.force_login(user)
+        cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+        self.stdout.write(f'{path} as {user.username}, {options["requests"]} requests per level, '
+                          f'{options["workers"]} worker(s)')
+        results = {'path': path, 'workers': options['workers'], 'servers': {}}
+        for name in servers:
+            url = f"http://{options['host']}:{options['port']}{path}"
+            with self._serve(name, options['host'], options['port'], options['workers']):
+                measure_concurrency(url, cookies, clients=min(clients), requests=min(clients) * 5)  # warm-up
+                results['servers'][name] = runs = []
+                for level in clients:
+                    run = measure_concurrency(url, cookies, clients=level, requests=options['requests'])
+                    runs.append(run)
+                    self.stdout.write(f"{name:5} clients={level:<4} {run['req_per_s']:>8} req/s  "
+                                      f"p50 {run['p50_ms']} ms  p95 {run['p95_ms']} ms  errors {run['errors']}")
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    @contextmanager
+    def _serve(self, name, host, port, workers):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        process = subprocess.Popen(SERVERS[name](host, port, workers), env=env)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f'{name} server exited with code {process.returncode}')
+                try:
+                    socket.create_connection((host, port), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'{name} server did not start listening on {host}:{port}')
+                    time.sleep(0.2)
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from myapp import events
+
+
+class Command(BaseCommand):
+    help = ('Fold the progress event log into TopicProgress rows and today\'s per-subject snapshots, '
+            'from where the last run stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=events.BATCH_SIZE,
+                            help='Events per transaction.')
+        parser.add_argument('--settle', type=int, default=events.SETTLE_SECONDS,
+                            help='Leave events younger than this many seconds for the next run.')
+
+    def handle(self, *args, **options):
+        result = events.compact(batch_size=options['batch_size'], settle=options['settle'])
+        self.stdout.write(f"Compacted {result['events']} event(s): {result['rows_written']} progress row(s), "
+                          f"{result['subjects']} subject snapshot(s) in {result['elapsed_ms']:.0f} ms")
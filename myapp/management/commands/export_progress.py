@@ -0,0 +1,35 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from myapp.exports import CHUNK_SIZE, EXPORT_FORMATS, iter_export
+from myapp.models import Subject
+
+
+class Command(BaseCommand):
+    help = 'Stream a subject\'s student x topic progress matrix as CSV or JSON lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('subject', type=int, help='Subject id.')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output as it is written.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            subject = Subject.objects.get(pk=options['subject'])
+        except Subject.DoesNotExist:
+            raise CommandError(f"Subject {options['subject']} does not exist")
+
+        lines = iter_export(subject, options['format'], options['chunk_size'])
+        if options['gzip']:
+            target = options['output'] or sys.stdout.buffer
+            with gzip.open(target, 'wt', encoding='utf-8', newline='') as fh:
+                fh.writelines(lines)
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+                fh.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
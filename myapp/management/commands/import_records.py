@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from myapp.imports import BATCH_SIZE, IMPORT_FORMATS, IMPORT_KINDS, guess_format, import_records
+from myapp.models import Subject
+
+
+class Command(BaseCommand):
+    help = 'Stream TopicProgress or LectureSession records from a CSV / JSON-lines file into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=IMPORT_KINDS)
+        parser.add_argument('path', help="File to read, or '-' for stdin.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Defaults to jsonl for .jsonl/.ndjson/.json files, csv otherwise.')
+        parser.add_argument('--subject', type=int, action='append', dest='subjects',
+                            help='Only accept rows for this subject id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        subjects = Subject.objects.filter(pk__in=options['subjects']) if options['subjects'] else None
+        if options['path'] == '-':
+            report = import_records(sys.stdin, options['kind'], fmt, subjects, options['batch_size'])
+        else:
+            try:
+                stream = open(options['path'], encoding='utf-8-sig', newline='')
+            except OSError as exc:
+                raise CommandError(exc)
+            with stream:
+                report = import_records(stream, options['kind'], fmt, subjects, options['batch_size'])
+
+        for line, reason in report.rejects:
+            self.stdout.write(f'line {line}: {reason}')
+        if report.rejected > len(report.rejects):
+            self.stdout.write(f'... {report.rejected - len(report.rejects)} more rejected rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.kind}: {report.written} written, {report.rejected} rejected of {report.read} rows '
+            f'in {report.elapsed:.2f}s ({report.rows_per_second} rows/s)'
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.models import Subject, SubjectProgressRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-subject progress rollups from scratch and report any drift from the stored counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', type=int, action='append', dest='subjects',
+                            help='Only this subject id (repeatable). Defaults to every subject.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift; exit with an error instead of rewriting.')
+
+    def handle(self, *args, **options):
+        fresh = SubjectProgressRollup.compute(options['subjects'])
+        stored = {r.subject_id: r for r in SubjectProgressRollup.objects.filter(subject_id__in=fresh)}
+        names = dict(Subject.objects.filter(pk__in=fresh).values_list('pk', 'name'))
+
+        drifted = []
+        for subject_id, values in fresh.items():
+            rollup = stored.get(subject_id)
+            if rollup is None:
+                drifted.append(subject_id)
+                self.stdout.write(f'{names[subject_id]}: missing rollup')
+                continue
+            diffs = [f'{field} {getattr(rollup, field)} -> {value}'
+                     for field, value in values.items() if getattr(rollup, field) != value]
+            if diffs:
+                drifted.append(subject_id)
+                self.stdout.write(f'{names[subject_id]}: ' + ', '.join(diffs))
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{len(drifted)} of {len(fresh)} rollups drifted')
+            self.stdout.write(self.style.SUCCESS(f'{len(fresh)} rollups checked, no drift'))
+            return
+
+        SubjectProgressRollup.rebuild(list(fresh))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(fresh)} rollups ({len(drifted)} had drifted)'
+        ))
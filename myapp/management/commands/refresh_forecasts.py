@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from myapp import forecast
+from myapp.models import Subject
+
+
+class Command(BaseCommand):
+    help = 'Recompute syllabus pace forecasts for subjects whose progress changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', type=int, action='append', dest='subjects',
+                            help='Only this subject id (repeatable). Defaults to every subject.')
+        parser.add_argument('--all', action='store_true', dest='force',
+                            help='Recompute every selected forecast, stale or not.')
+
+    def handle(self, *args, **options):
+        subjects = Subject.objects.all()
+        if options['subjects']:
+            subjects = subjects.filter(pk__in=options['subjects'])
+        refreshed = forecast.refresh(subjects, force=options['force'])
+        self.stdout.write(f'Refreshed {refreshed} forecast(s)')
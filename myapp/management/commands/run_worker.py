@@ -0,0 +1,26 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from myapp import jobs
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (myapp/jobs.py) on a pool of threads until interrupted. '
+            'Start several for more throughput; they share the queue safely.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Jobs run at the same time by this process.')
+        parser.add_argument('--poll', type=float, default=jobs.POLL_SECONDS,
+                            help='Seconds to wait before looking again when nothing is due.')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due instead of waiting.')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        # finish the running jobs, then exit; the pool threads can't be interrupted mid-job
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: stop.set())
+        name = jobs.worker_name()
+        self.stdout.write(f'Worker {name}: {options["threads"]} thread(s), tasks: {", ".join(sorted(jobs.TASKS))}')
+        done = jobs.work(threads=options['threads'], once=options['once'], poll=options['poll'], stop=stop, name=name)
+        self.stdout.write(f'Ran {done} job(s)')
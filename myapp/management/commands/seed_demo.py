@@ -180,6 +180,10 @@ class Command(BaseCommand):
                         defaults={'status': status},
                     )
 
+        # Enroll students so their progress counts towards the subject
+        for student in User.objects.filter(groups=student_group):
+            Enrollment.objects.get_or_create(user=student, subject=subj, defaults={'role': 'student'})
+
         # --- Lecture Sessions (roughly one per teaching hour over time; here every 3 days) ---
         session_dates = [
             (start_date + timedelta(days=i), f'Java Lecture {i // 3 + 1}')
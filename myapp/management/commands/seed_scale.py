@@ -0,0 +1,154 @@
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from myapp import jobs, rosters
+from myapp.models import (Subject, Chapter, Topic, TopicStatus, LectureSession, TopicProgress, Enrollment,
+                          SubjectProgressRollup, Profile)
+
+STATUSES = ('completed', 'in_progress', 'not_started')
+SEED_OPTIONS = ('institutions', 'subjects', 'chapters', 'topics', 'students', 'sessions', 'progress', 'seed',
+                'batch_size', 'prefix')
+
+
+def parse_distribution(value):
+    """'completed=40,in_progress=20,not_started=40' -> weights in STATUSES order."""
+    weights = dict.fromkeys(STATUSES, 0.0)
+    for part in value.split(','):
+        status, _, weight = part.partition('=')
+        if status.strip() not in weights:
+            raise CommandError(f'Unknown progress status {status!r}')
+        weights[status.strip()] = float(weight)
+    if not any(weights.values()):
+        raise CommandError('Progress distribution needs at least one non-zero weight')
+    return [weights[s] for s in STATUSES]
+
+
+class Command(BaseCommand):
+    help = ('Generate load-test sized data (institutions x subjects x chapters x topics x students) '
+            'with batched bulk inserts. Output is deterministic for a given --seed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institutions', type=int, default=1)
+        parser.add_argument('--subjects', type=int, default=10, help='Subjects per institution.')
+        parser.add_argument('--chapters', type=int, default=6, help='Chapters per subject.')
+        parser.add_argument('--topics', type=int, default=8, help='Topics per chapter.')
+        parser.add_argument('--students', type=int, default=200, help='Students per institution.')
+        parser.add_argument('--sessions', type=int, default=30, help='Lecture sessions per subject.')
+        parser.add_argument('--progress', default='completed=40,in_progress=20,not_started=40',
+                            help='Relative weights of the per-student topic statuses.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='scale', help='Prefix for generated usernames and subject names.')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the seeding as a background job for run_worker instead of running it now.')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('call_command', {'command': 'seed_scale', 'options': {
+                name: options[name] for name in SEED_OPTIONS}})
+            self.stdout.write(f'Queued job #{job.pk}')
+            return
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if Subject.objects.filter(name__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Data with prefix {prefix!r} already exists; pick another --prefix')
+        rng = random.Random(options['seed'])
+        weights = parse_distribution(options['progress'])
+        started = time.perf_counter()
+
+        teacher_group, _ = Group.objects.get_or_create(name='Teacher')
+        student_group, _ = Group.objects.get_or_create(name='Student')
+        # hash once; every generated account shares the password
+        teacher_password = make_password('teacherpass')
+        student_password = make_password('studentpass')
+        today = timezone.now().date()
+
+        subject_ids = []
+        for inst in range(options['institutions']):
+            tag = f'{prefix}-i{inst}'
+            teachers = self.bulk(User, (
+                User(username=f'{tag}-teacher{n}', password=teacher_password)
+                for n in range(max(options['subjects'] // 5, 1))
+            ))
+            students = self.bulk(User, (
+                User(username=f'{tag}-student{n}', password=student_password)
+                for n in range(options['students'])
+            ))
+            self.bulk(Profile, (Profile(user_id=u.pk) for u in teachers + students), keep=False)
+            self.bulk(User.groups.through, (
+                User.groups.through(user_id=u.pk, group_id=teacher_group.pk) for u in teachers
+            ), keep=False)
+            self.bulk(User.groups.through, (
+                User.groups.through(user_id=u.pk, group_id=student_group.pk) for u in students
+            ), keep=False)
+
+            subjects = self.bulk(Subject, (
+                Subject(name=f'{tag}-subject{n}', class_name=f'{tag.upper()}-SEM-{n % 8 + 1}',
+                        planned_lectures=options['sessions'] + rng.randint(0, 10),
+                        start_date=today - timedelta(days=2 * options['sessions']),
+                        end_date=today + timedelta(days=rng.randint(14, 120)),
+                        teacher=teachers[n % len(teachers)])
+                for n in range(options['subjects'])
+            ))
+            subject_ids.extend(s.pk for s in subjects)
+            self.bulk(Enrollment, (
+                Enrollment(user_id=u.pk, subject_id=s.pk, role='student') for s in subjects for u in students
+            ), keep=False)
+            chapters = self.bulk(Chapter, (
+                Chapter(subject=s, title=f'Chapter {c + 1}', order=c + 1)
+                for s in subjects for c in range(options['chapters'])
+            ))
+            topics = self.bulk(Topic, (
+                Topic(chapter=ch, title=f'Topic {t + 1}', order=t + 1)
+                for ch in chapters for t in range(options['topics'])
+            ))
+            self.bulk(TopicStatus, (
+                TopicStatus(topic=t, completed=rng.random() < weights[0] / sum(weights))
+                for t in topics
+            ), keep=False)
+            self.bulk(TopicProgress, (
+                TopicProgress(student_id=u.pk, topic_id=t.pk, subject_id=t.chapter.subject_id,
+                              status=rng.choices(STATUSES, weights)[0])
+                for t in topics for u in students
+            ), keep=False)
+            self.bulk(LectureSession, (
+                LectureSession(subject=s, date=today - timedelta(days=2 * n),
+                               attendees=rng.randint(len(students) // 2, len(students)) if students else 0,
+                               notes=f'Lecture {options["sessions"] - n}')
+                for s in subjects for n in range(options['sessions'])
+            ), keep=False)
+
+        # bulk inserts skip the signal handlers that keep these current
+        rosters.invalidate_rosters()
+        SubjectProgressRollup.rebuild(subject_ids)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(subject_ids)} subjects in {elapsed:.1f}s'))
+        for model, (rows, seconds) in self.stats.items():
+            self.stdout.write(f'  {model.__name__}: {rows} rows, {rows / max(seconds, 1e-9):,.0f} rows/s')
+
+    def bulk(self, model, objs, keep=True):
+        """Insert ``objs`` in batch_size chunks, one transaction per chunk; returns them if ``keep``."""
+        if not hasattr(self, 'stats'):
+            self.stats = {}
+        kept = []
+        objs = iter(objs)
+        while True:
+            chunk = list(islice(objs, self.batch_size))
+            if not chunk:
+                break
+            started = time.perf_counter()
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            rows, seconds = self.stats.get(model, (0, 0.0))
+            self.stats[model] = (rows + len(chunk), seconds + time.perf_counter() - started)
+            if keep:
+                kept.extend(chunk)
+        return kept
@@ -0,0 +1,92 @@
+"""Project middleware that has to work under both WSGI and ASGI.
+
+Django runs a sync-only middleware, and everything below it, in a worker thread. So
+one sync-only entry near the top of MIDDLEWARE would make every async view run
+through async_to_sync, pinning a thread for the whole request again.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import timings
+
+logger = logging.getLogger(__name__)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware that also runs natively in async mode.
+
+    Static files are still served by WhiteNoise, in a thread. Every other request goes
+    straight to the next async handler.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestTimingMiddleware:
+    """Times every request: query count, DB, template and total time (see timings.py).
+
+    Adds a ``Server-Timing`` header (shown in the browser's network panel) unless
+    SERVER_TIMING_HEADER is off, logs one ``request_timing`` line and records the request
+    in the per-URL-name histogram behind the request_stats page. Put it first in
+    MIDDLEWARE so the total covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        timings.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing, token = timings.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.stop(token)
+        return self._finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing, token = timings.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.stop(token)
+        return self._finish(request, response, timing)
+
+    def _finish(self, request, response, timing):
+        timing.finish()
+        match = request.resolver_match
+        name = match.view_name if match else timings.UNRESOLVED
+        timings.record(name, timing)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = timing.server_timing()
+        logger.info('request_timing %s', {
+            'view': name, 'method': request.method, 'status': response.status_code, **timing.as_dict(),
+        })
+        return response
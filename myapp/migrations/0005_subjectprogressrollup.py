@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_subject_teacher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectProgressRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('not_started_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='myapp.subject')),
+            ],
+        ),
+    ]
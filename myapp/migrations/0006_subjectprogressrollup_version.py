@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_subjectprogressrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subjectprogressrollup',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
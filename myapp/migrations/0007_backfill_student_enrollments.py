@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def backfill_student_enrollments(apps, schema_editor):
+    """Enroll every Student group member in every subject.
+
+    Progress used to count each Student group member towards every subject; progress
+    is now scoped to Enrollment(role='student'), so this keeps existing numbers intact.
+    Classes can be trimmed to their real rosters afterwards in the admin.
+    """
+    Enrollment = apps.get_model('myapp', 'Enrollment')
+    Subject = apps.get_model('myapp', 'Subject')
+    User = apps.get_model('auth', 'User')
+    student_ids = list(User.objects.filter(groups__name='Student').values_list('pk', flat=True))
+    for subject_id in Subject.objects.values_list('pk', flat=True):
+        Enrollment.objects.bulk_create(
+            [Enrollment(user_id=pk, subject_id=subject_id, role='student') for pk in student_ids],
+            batch_size=1000, ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_subjectprogressrollup_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_student_enrollments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Nullable TopicProgress.subject; 0009 fills it in and 0010 makes it NOT NULL. Three
+# migrations, so three transactions: PostgreSQL refuses to alter a table with pending
+# trigger events, which the backfill's UPDATE leaves behind until it commits.
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_backfill_student_enrollments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topicprogress',
+            name='subject',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='topic_progress', to='myapp.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='chapter',
+            index=models.Index(fields=['subject', 'order'], name='chapter_subject_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['chapter', 'order'], name='topic_chapter_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturesession',
+            index=models.Index(fields=['subject', '-date', '-id'], name='session_subject_date_idx'),
+        ),
+    ]
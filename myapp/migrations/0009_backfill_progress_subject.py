@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_progress_subject(apps, schema_editor):
+    TopicProgress = apps.get_model('myapp', 'TopicProgress')
+    Topic = apps.get_model('myapp', 'Topic')
+    TopicProgress.objects.update(
+        subject=Subquery(Topic.objects.filter(pk=OuterRef('topic')).values('chapter__subject')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0008_progress_subject_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_progress_subject, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_backfill_progress_subject'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='topicprogress',
+            name='subject',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='topic_progress', to='myapp.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='topicprogress',
+            index=models.Index(fields=['student', 'subject', 'status'], name='progress_student_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topicprogress',
+            index=models.Index(fields=['subject', 'status'], name='progress_subject_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_progress_subject_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topicstatus',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
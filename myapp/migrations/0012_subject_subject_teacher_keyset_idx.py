@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_topicstatus_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['teacher', 'class_name', 'name', 'id'], name='subject_teacher_keyset_idx'),
+        ),
+    ]
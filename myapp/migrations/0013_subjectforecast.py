@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_subject_subject_teacher_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topics_per_week', models.FloatField(default=0)),
+                ('lectures_per_week', models.FloatField(default=0)),
+                ('projected_finish', models.DateField(blank=True, null=True)),
+                ('projected_lectures', models.PositiveIntegerField(blank=True, null=True)),
+                ('days_late', models.IntegerField(blank=True, null=True)),
+                ('alert', models.CharField(blank=True, max_length=250)),
+                ('source_version', models.PositiveBigIntegerField(default=0)),
+                ('computed_on', models.DateField()),
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='myapp.subject')),
+            ],
+        ),
+    ]
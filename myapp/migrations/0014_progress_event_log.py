@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_subjectforecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressCompaction',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProgressEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('not_started', 'Not Started'), ('in_progress', 'In Progress'), ('completed', 'Completed')], max_length=20)),
+                ('source', models.CharField(choices=[('toggle', 'Topic toggle'), ('admin', 'Admin action'), ('import', 'Import')], max_length=10)),
+                ('applied', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='myapp.subject')),
+                ('topic', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='myapp.topic')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubjectProgressSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('topic_count', models.IntegerField(default=0)),
+                ('topics_completed', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('not_started_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('event_count', models.IntegerField(default=0)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='myapp.subject')),
+            ],
+            options={
+                'ordering': ('subject', 'day'),
+                'unique_together': {('subject', 'day')},
+            },
+        ),
+    ]
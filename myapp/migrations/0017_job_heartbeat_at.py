@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeat(apps, schema_editor):
+    # jobs running across the upgrade last beat when they started
+    Job = apps.get_model('myapp', 'Job')
+    Job.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_progressevent_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeat, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,15 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
+from .pubsub import publish_progress
+# imported before the receivers below are defined so roster caches are invalidated first
+from . import rosters
+
 ROLE_CHOICES = (('teacher','Teacher'), ('student','Student'))
 PROGRESS_STATUS_CHOICES = (
     ('not_started', 'Not Started'),
@@ -14,6 +20,33 @@ PROGRESS_STATUS_CHOICES = (
     ('completed', 'Completed')
 )
 
+class SubjectQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Annotate lecture count, topic count and weighted progress in the same SELECT.
+
+        Subject.conducted_lectures / progress_percent use these annotations when present,
+        so listing pages run a constant number of queries regardless of subject count.
+        """
+        sessions = (LectureSession.objects.filter(subject=OuterRef('pk')).order_by()
+                    .values('subject').annotate(n=Count('id')).values('n'))
+        completed = Cast('rollup__completed_count', FloatField())
+        in_progress = Cast('rollup__in_progress_count', FloatField())
+        weighted = (completed + in_progress * 0.5) * 100.0 / (
+            Cast('rollup__student_count', FloatField()) * Cast('rollup__topic_count', FloatField())
+        )
+        return self.annotate(
+            lecture_count=Coalesce(Subquery(sessions), 0),
+            topic_total=Coalesce('rollup__topic_count', 0),
+            annotated_progress=Case(
+                # no rollup row yet: leave it to the property, which builds one
+                When(rollup__isnull=True, then=Value(None)),
+                When(Q(rollup__topic_count=0) | Q(rollup__student_count=0), then=Value(0.0)),
+                default=weighted,
+                output_field=FloatField(),
+            ),
+        )
+
+
 class Subject(models.Model):
     """A subject in a class (e.g., Cyber Security) with planned lectures + schedule window."""
     name = models.CharField(max_length=200, unique=True)
@@ -23,11 +56,19 @@ class Subject(models.Model):
     end_date = models.DateField(null=True, blank=True)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='taught_subjects', null=True)
 
+    objects = SubjectQuerySet.as_manager()
+
+    class Meta:
+        # the teacher dashboard's keyset pages (myapp/pagination.py)
+        indexes = [models.Index(fields=['teacher', 'class_name', 'name', 'id'], name='subject_teacher_keyset_idx')]
+
     def __str__(self):
         return f"{self.class_name} · {self.name}"
 
     @property
     def conducted_lectures(self):
+        if hasattr(self, 'lecture_count'):
+            return self.lecture_count
         return self.sessions.count()
 
     @property
@@ -36,27 +77,11 @@ class Subject(models.Model):
 
     @property
     def progress_percent(self):
-        """Calculate overall progress percentage across all students."""
-        total_topics = Topic.objects.filter(chapter__subject=self).count()
-        if total_topics == 0:
-            return 0
-        
-        completed = TopicProgress.objects.filter(
-            topic__chapter__subject=self,
-            status='completed'
-        ).count()
-        in_progress = TopicProgress.objects.filter(
-            topic__chapter__subject=self,
-            status='in_progress'
-        ).count()
-        
-        student_count = User.objects.filter(groups__name='Student').count()
-        if student_count == 0:
-            return 0
-            
-        # Count completed as 100% and in_progress as 50%
-        weighted_progress = (completed + (in_progress * 0.5)) / student_count
-        return round((weighted_progress / total_topics) * 100, 1)
+        """Overall progress percentage across all students (read from the rollup row)."""
+        annotated = getattr(self, 'annotated_progress', None)
+        if annotated is not None:
+            return round(annotated, 1)
+        return SubjectProgressRollup.for_subject(self).progress_percent
 
 class Chapter(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='chapters')
@@ -65,6 +90,14 @@ class Chapter(models.Model):
 
     class Meta:
         ordering = ('order', 'id')
+        indexes = [models.Index(fields=['subject', 'order'], name='chapter_subject_order_idx')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored subject so a move recounts both rollups
+        instance._loaded_subject_id = instance.__dict__.get('subject_id')
+        return instance
 
     def __str__(self):
         return f"{self.subject.name}: {self.title}"
@@ -77,6 +110,14 @@ class Topic(models.Model):
     class Meta:
         ordering = ('order', 'id')
         unique_together = ('chapter','title')
+        indexes = [models.Index(fields=['chapter', 'order'], name='topic_chapter_order_idx')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored chapter so a move to another subject recounts both rollups
+        instance._loaded_chapter_id = instance.__dict__.get('chapter_id')
+        return instance
 
     def __str__(self):
         return self.title
@@ -87,6 +128,8 @@ class TopicStatus(models.Model):
     completed = models.BooleanField(default=False)
     updated_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
     updated_at = models.DateTimeField(auto_now=True)
+    # bumped by every propagate_topic_status() write; toggle_topic posts the one it rendered
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.topic} - {'Done' if self.completed else 'Pending'}"
@@ -100,6 +143,7 @@ class LectureSession(models.Model):
 
     class Meta:
         ordering = ('-date','-id')
+        indexes = [models.Index(fields=['subject', '-date', '-id'], name='session_subject_date_idx')]
 
     def __str__(self):
         return f"{self.subject.name} · {self.date} · {self.attendees}"
@@ -121,16 +165,230 @@ class TopicProgress(models.Model):
     """Tracks a student's progress on individual topics."""
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_progress')
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='student_progress')
+    # denormalized topic.chapter.subject so progress filters skip the topic/chapter joins,
+    # rewritten when a topic or chapter moves; no index of its own, progress_subject_status_idx leads with it
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topic_progress',
+                                editable=False, db_index=False)
     status = models.CharField(max_length=20, choices=PROGRESS_STATUS_CHOICES, default='not_started')
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['student', 'topic']
         ordering = ['topic__chapter__order', 'topic__order']
+        indexes = [
+            models.Index(fields=['student', 'subject', 'status'], name='progress_student_subject_idx'),
+            models.Index(fields=['subject', 'status'], name='progress_subject_status_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.subject_id is None:
+            self.subject_id = self.topic.chapter.subject_id
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored status so the rollup can move one count to another on save
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
     def __str__(self):
         return f"{self.student.username} - {self.topic.title}: {self.get_status_display()}"
 
+class SubjectProgressRollup(models.Model):
+    """Denormalized per-subject progress counts, kept current by the signal handlers below."""
+    subject = models.OneToOneField(Subject, on_delete=models.CASCADE, related_name='rollup')
+    topic_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    not_started_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    # bumped on every change to anything a subject page shows; drives ETag/Last-Modified
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    STATUS_FIELDS = {
+        'completed': 'completed_count',
+        'in_progress': 'in_progress_count',
+        'not_started': 'not_started_count',
+    }
+    COUNT_FIELDS = ('topic_count', 'completed_count', 'in_progress_count', 'not_started_count', 'student_count')
+
+    def __str__(self):
+        return f"Rollup: {self.subject.name}"
+
+    @property
+    def progress_percent(self):
+        if self.topic_count == 0 or self.student_count == 0:
+            return 0
+        # Count completed as 100% and in_progress as 50%
+        weighted_progress = (self.completed_count + (self.in_progress_count * 0.5)) / self.student_count
+        return round((weighted_progress / self.topic_count) * 100, 1)
+
+    @classmethod
+    def compute(cls, subject_ids=None):
+        """Count everything from scratch; returns {subject_id: {field: value}}."""
+        subjects = Subject.objects.all()
+        if subject_ids is not None:
+            subjects = subjects.filter(pk__in=subject_ids)
+        counts = {pk: dict.fromkeys(cls.COUNT_FIELDS, 0) for pk in subjects.values_list('pk', flat=True)}
+        students = (Enrollment.objects.filter(subject__in=counts, role='student')
+                    .values('subject').annotate(n=Count('id')))
+        for row in students:
+            counts[row['subject']]['student_count'] = row['n']
+        topics = (Topic.objects.filter(chapter__subject__in=counts)
+                  .values('chapter__subject').annotate(n=Count('id')))
+        for row in topics:
+            counts[row['chapter__subject']]['topic_count'] = row['n']
+        # only rows of students enrolled in the topic's subject count towards it
+        enrolled = Enrollment.objects.filter(user=OuterRef('student'), subject=OuterRef('subject'), role='student')
+        progress = (TopicProgress.objects.filter(Exists(enrolled), subject__in=counts)
+                    .order_by().values('subject', 'status').annotate(n=Count('id')))
+        for row in progress:
+            counts[row['subject']][cls.STATUS_FIELDS[row['status']]] = row['n']
+        return counts
+
+    @classmethod
+    def rebuild(cls, subject_ids=None):
+        """Recompute and store rollups for the given subjects (all when None)."""
+        counts = cls.compute(subject_ids)
+        for subject_id, values in counts.items():
+            cls.objects.update_or_create(subject_id=subject_id, defaults=values)
+        cls.objects.filter(subject_id__in=counts).update(version=F('version') + 1)
+        publish_progress(counts)
+        return counts
+
+    @classmethod
+    def for_subject(cls, subject):
+        try:
+            return subject.rollup
+        except cls.DoesNotExist:
+            cls.rebuild([subject.pk])
+            return cls.objects.get(subject=subject)
+
+    @classmethod
+    def adjust(cls, subject_id, **deltas):
+        """Apply count deltas to one subject's rollup in a single UPDATE."""
+        deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if subject_id is not None and deltas:
+            cls.objects.filter(subject_id=subject_id).update(
+                version=F('version') + 1, updated_at=timezone.now(), **deltas
+            )
+            publish_progress([subject_id])
+
+    @classmethod
+    def touch(cls, subject_id):
+        """Bump the content version after a change that doesn't move any count."""
+        if subject_id is not None:
+            cls.objects.filter(subject_id=subject_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class SubjectForecast(models.Model):
+    """Projected syllabus finish for a subject, refreshed by myapp/forecast.py."""
+    subject = models.OneToOneField(Subject, on_delete=models.CASCADE, related_name='forecast')
+    topics_per_week = models.FloatField(default=0)
+    lectures_per_week = models.FloatField(default=0)
+    projected_finish = models.DateField(null=True, blank=True)  # None while there is no pace to project
+    projected_lectures = models.PositiveIntegerField(null=True, blank=True)
+    days_late = models.IntegerField(null=True, blank=True)  # projected_finish - end_date; negative is early
+    alert = models.CharField(max_length=250, blank=True)
+    # the rollup version and day it was computed for; either moving makes it stale
+    source_version = models.PositiveBigIntegerField(default=0)
+    computed_on = models.DateField()
+
+    def __str__(self):
+        return f"{self.subject.name}: {self.projected_finish or 'no pace yet'}"
+
+
+class ProgressEvent(models.Model):
+    """One progress write, appended and never updated; folded in by myapp/events.py."""
+    SOURCE_CHOICES = (('toggle', 'Topic toggle'), ('admin', 'Admin action'), ('import', 'Import'))
+
+    # compaction reads the log in primary key order; the foreign key indexes are for the
+    # cascades, which would otherwise scan the whole log for every subject, topic or user deleted
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='+')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='+')
+    # None for a class-wide event: the status applies to every enrolled student
+    student = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=PROGRESS_STATUS_CHOICES)
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    # False when the writer left the TopicProgress rows to compaction
+    applied = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"#{self.pk} {self.source}: topic {self.topic_id} {self.status}"
+
+
+class ProgressCompaction(models.Model):
+    """How far compaction has read the event log."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: up to event {self.last_event_id}"
+
+
+class SubjectProgressSnapshot(models.Model):
+    """A subject's progress counts as of the last compaction on ``day``."""
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='snapshots', db_index=False)
+    day = models.DateField()
+    topic_count = models.IntegerField(default=0)
+    topics_completed = models.IntegerField(default=0)  # class-level TopicStatus rows marked completed
+    completed_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    not_started_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    event_count = models.IntegerField(default=0)  # events compacted into this day's snapshot
+
+    class Meta:
+        ordering = ('subject', 'day')
+        # also the (subject, day) index trend and pace queries range-scan
+        unique_together = ('subject', 'day')
+
+    def __str__(self):
+        return f"{self.subject.name} · {self.day}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_worker`` (see myapp/jobs.py)."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)  # keyword arguments of the task
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # pushed back by the retry backoff
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)  # of the last failed attempt
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+                                   db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # renewed by the worker while the job runs; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after', 'id'], name='job_claim_idx')]
+
+    def __str__(self):
+        return f"#{self.pk} {self.task} ({self.status})"
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+
 class Profile(models.Model):
     """Extended user profile to store optional user details used in the UI."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -154,3 +412,126 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
             instance.profile.save()
         except Profile.DoesNotExist:
             Profile.objects.create(user=instance)
+
+
+# --- Progress rollup maintenance ---
+
+def _topic_subject_id(topic_id):
+    return Topic.objects.filter(pk=topic_id).values_list('chapter__subject_id', flat=True).first()
+
+
+def _chapter_subject_id(chapter_id):
+    return Chapter.objects.filter(pk=chapter_id).values_list('subject_id', flat=True).first()
+
+
+@receiver(post_save, sender=Subject)
+def create_subject_rollup(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        SubjectProgressRollup.rebuild([instance.pk])
+
+
+@receiver(pre_save, sender=Topic)
+@receiver(pre_save, sender=Chapter)
+def remember_parent(sender, instance, raw=False, **kwargs):
+    # saved without being loaded first: look up where the row is stored now
+    field = 'chapter_id' if sender is Topic else 'subject_id'
+    if not raw and instance.pk is not None and not hasattr(instance, f'_loaded_{field}'):
+        setattr(instance, f'_loaded_{field}',
+                sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first())
+
+
+def _moved(instance, field, subject_of):
+    """(previous subject, subject) when this save moved ``instance`` to another subject, else None."""
+    previous = getattr(instance, f'_loaded_{field}', None)
+    current = getattr(instance, field)
+    setattr(instance, f'_loaded_{field}', current)
+    if previous is None or previous == current:
+        return None
+    old_subject, subject = subject_of(previous), subject_of(current)
+    return (old_subject, subject) if old_subject != subject else None
+
+
+@receiver(post_save, sender=Topic)
+def rollup_topic_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        instance._loaded_chapter_id = instance.chapter_id
+        SubjectProgressRollup.adjust(_chapter_subject_id(instance.chapter_id), topic_count=1)
+        return
+    moved = _moved(instance, 'chapter_id', _chapter_subject_id)
+    if moved:
+        # its topic count and progress rows go with it
+        TopicProgress.objects.filter(topic=instance).update(subject_id=moved[1])
+        SubjectProgressRollup.rebuild([pk for pk in moved if pk is not None])
+    else:
+        SubjectProgressRollup.touch(_chapter_subject_id(instance.chapter_id))
+
+
+@receiver(post_delete, sender=Topic)
+def rollup_topic_removed(sender, instance, **kwargs):
+    SubjectProgressRollup.adjust(_chapter_subject_id(instance.chapter_id), topic_count=-1)
+
+
+@receiver(post_save, sender=TopicProgress)
+def rollup_progress_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    subject_id = instance.subject_id
+    previous = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if not rosters.is_enrolled(subject_id, instance.student_id):
+        return
+    fields = SubjectProgressRollup.STATUS_FIELDS
+    if created:
+        SubjectProgressRollup.adjust(subject_id, **{fields[instance.status]: 1})
+    elif previous is None:
+        # saved without being loaded first: the old status is unknown, recount this subject
+        SubjectProgressRollup.rebuild([subject_id])
+    elif previous != instance.status:
+        SubjectProgressRollup.adjust(subject_id, **{fields[previous]: -1, fields[instance.status]: 1})
+
+
+@receiver(post_delete, sender=TopicProgress)
+def rollup_progress_removed(sender, instance, **kwargs):
+    subject_id = instance.subject_id
+    if not rosters.is_enrolled(subject_id, instance.student_id):
+        return
+    status = getattr(instance, '_loaded_status', None) or instance.status
+    SubjectProgressRollup.adjust(subject_id, **{SubjectProgressRollup.STATUS_FIELDS[status]: -1})
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def rollup_enrollment_changed(sender, instance, raw=False, **kwargs):
+    # the student's existing progress rows start or stop counting: recount the subject
+    if not raw:
+        SubjectProgressRollup.rebuild([instance.subject_id])
+
+
+@receiver(post_save, sender=Chapter)
+def rollup_chapter_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    moved = None if created else _moved(instance, 'subject_id', lambda subject_id: subject_id)
+    instance._loaded_subject_id = instance.subject_id
+    if moved:
+        TopicProgress.objects.filter(topic__chapter=instance).update(subject_id=instance.subject_id)
+        SubjectProgressRollup.rebuild([pk for pk in moved if pk is not None])
+    else:
+        SubjectProgressRollup.touch(instance.subject_id)
+
+
+@receiver(post_delete, sender=Chapter)
+@receiver(post_save, sender=LectureSession)
+@receiver(post_delete, sender=LectureSession)
+def touch_subject(sender, instance, raw=False, **kwargs):
+    if not raw:
+        SubjectProgressRollup.touch(instance.subject_id)
+
+
+@receiver(post_save, sender=TopicStatus)
+@receiver(post_delete, sender=TopicStatus)
+def touch_subject_for_status(sender, instance, raw=False, **kwargs):
+    if not raw:
+        SubjectProgressRollup.touch(_topic_subject_id(instance.topic_id))
@@ -0,0 +1,92 @@
+"""Set-based fan-out of class-level topic status to per-student TopicProgress rows."""
+import logging
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import events, jobs, rosters
+from .models import TopicStatus, TopicProgress, SubjectProgressRollup, ProgressEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+class TopicStatusConflict(Exception):
+    """The topic's status is no longer at the version the caller expected."""
+
+
+def _write_status(topic, completed, updated_by, expected_version):
+    # a conditional UPDATE: it locks only this topic's status row, and once the row is
+    # locked a concurrent writer re-checks the version and matches nothing
+    matching = TopicStatus.objects.filter(topic=topic)
+    if expected_version is not None:
+        matching = matching.filter(version=expected_version)
+    if matching.update(completed=completed, updated_by=updated_by, updated_at=timezone.now(),
+                       version=F('version') + 1):
+        return
+    if expected_version not in (None, 0):
+        raise TopicStatusConflict(f'topic {topic.pk} status is not at version {expected_version}')
+    try:
+        with transaction.atomic():
+            TopicStatus.objects.create(topic=topic, completed=completed, updated_by=updated_by, version=1)
+    except IntegrityError:
+        # someone else created the row first
+        raise TopicStatusConflict(f'topic {topic.pk} status was created concurrently')
+
+
+def propagate_topic_status(topic, completed, updated_by=None, expected_version=None, source='toggle'):
+    """Mark ``topic`` done (or pending) for the class and upsert every student's progress row.
+
+    Runs in one transaction: the TopicStatus write, one ``bulk_create(update_conflicts=True)``
+    per BATCH_SIZE students, a recount of the subject's rollup (bulk writes skip signals)
+    and a class-wide ProgressEvent. With ``PROGRESS_FANOUT = 'deferred'`` the student rows
+    are left to ``events.compact()``, queued as a background job, and only the status
+    and the event are written.
+    With ``expected_version`` the status is only written if it is still at that version
+    (0 meaning no status row yet), otherwise TopicStatusConflict is raised and nothing changes.
+    Returns a dict of row counts and elapsed milliseconds so callers can log or display it.
+    """
+    started = time.perf_counter()
+    new_status = 'completed' if completed else 'in_progress'
+    deferred = events.deferred_fanout()
+    with transaction.atomic():
+        _write_status(topic, completed, updated_by, expected_version)
+        subject_id = topic.chapter.subject_id
+        # every enrolled student gets a row: don't trust a roster cached by another process
+        student_ids = rosters.student_ids(subject_id, fresh=True)
+        rows = []
+        if deferred:
+            # the UPDATE skips the TopicStatus receiver and no count moves yet
+            SubjectProgressRollup.touch(subject_id)
+            # one queued compaction covers every toggle until it runs; due once the event has settled
+            transaction.on_commit(lambda: jobs.enqueue('compact_progress', delay=events.SETTLE_SECONDS, unique=True))
+        else:
+            now = timezone.now()
+            rows = [TopicProgress(student_id=pk, topic=topic, subject_id=subject_id, status=new_status,
+                                  updated_at=now)
+                    for pk in student_ids]
+            TopicProgress.objects.bulk_create(
+                rows, batch_size=BATCH_SIZE,
+                update_conflicts=True, unique_fields=['student', 'topic'], update_fields=['status', 'updated_at'],
+            )
+            SubjectProgressRollup.rebuild([subject_id])
+        events.append([ProgressEvent(subject_id=subject_id, topic=topic, status=new_status, actor=updated_by,
+                                     source=source, applied=not deferred)])
+    result = {
+        'topic_id': topic.pk,
+        'status': new_status,
+        'students': len(student_ids),
+        'rows_written': len(rows),
+        'deferred': deferred,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info('propagate_topic_status %s', result)
+    return result
+
+
+def propagate_topics(topics, completed, updated_by=None, source='toggle'):
+    """Propagate the same state to several topics; returns one result per topic."""
+    return [propagate_topic_status(topic, completed, updated_by, source=source) for topic in topics]
@@ -0,0 +1,90 @@
+"""In-process publish/subscribe used to push progress updates to open SSE streams.
+
+LocalBroker only reaches subscribers living in the same process. Anything exposing the
+same ``publish(channel, message)`` / ``subscribe(*channels)`` pair (e.g. a Redis-backed
+broker) can be swapped in through the PROGRESS_BROKER setting.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> {(loop, queue), ...}
+
+    def publish(self, channel, message=None):
+        """Deliver ``(channel, message)`` to every subscriber; safe to call from any thread."""
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (channel, message))
+            except RuntimeError:
+                # subscriber's event loop already closed; its finally block will unregister it
+                pass
+        return len(targets)
+
+    def subscribe(self, *channels):
+        """Async context manager yielding an asyncio.Queue receiving ``(channel, message)``."""
+        return _Subscription(self, channels)
+
+    def _add(self, channels, entry):
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(entry)
+
+    def _discard(self, channels, entry):
+        with self._lock:
+            for channel in channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(entry)
+                    if not subs:
+                        del self._subscribers[channel]
+
+
+class _Subscription:
+    # a plain class rather than @asynccontextmanager: a generator-based manager gets
+    # finalized on its own at loop shutdown, racing the stream that is still inside it
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+
+    async def __aenter__(self):
+        self.entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self.broker._add(self.channels, self.entry)
+        return self.entry[1]
+
+    async def __aexit__(self, *exc_info):
+        self.broker._discard(self.channels, self.entry)
+        return False
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'PROGRESS_BROKER', 'myapp.pubsub.LocalBroker'))()
+    return _broker
+
+
+def subject_channel(subject_id):
+    return f'subject:{subject_id}'
+
+
+def publish_progress(subject_ids):
+    """Announce that these subjects' progress changed, once the current transaction commits."""
+    subject_ids = list(subject_ids)
+
+    def send():
+        broker = get_broker()
+        for subject_id in subject_ids:
+            broker.publish(subject_channel(subject_id))
+
+    transaction.on_commit(send)
@@ -0,0 +1,139 @@
+"""Role lookups for users, resolved at most once per request.
+
+The roles are the user's group names as stored, cached on the user instance. Since
+``request.user`` is the same object for the whole request, every view, decorator and
+template filter after the first one reads the cached set instead of querying auth_group.
+With ``ROLE_SESSION_CACHE = True`` RoleMiddleware also keeps a copy in the session,
+stamped with a generation counter that group changes bump in the cache.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+# bumped when the stored roles changed shape (they used to be lower-cased)
+SESSION_KEY = '_myapp_roles_v2'
+GLOBAL_GENERATION_KEY = 'roles:gen'
+
+
+def _user_generation_key(user_id):
+    return f'roles:gen:{user_id}'
+
+
+def get_roles(user):
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_roles_cache', None)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        user._roles_cache = roles
+    return roles
+
+
+async def aget_roles(user):
+    """get_roles() for async views, caching on the user the same way."""
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_roles_cache', None)
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        user._roles_cache = roles
+    return roles
+
+
+def has_role(user, role):
+    """Whether the user is in the group named exactly ``role``."""
+    return role in get_roles(user)
+
+
+def _has_role_iexact(user, role):
+    role = role.lower()
+    return any(name.lower() == role for name in get_roles(user))
+
+
+def is_teacher(user):
+    # case-insensitive, like the name__iexact group lookups the views have always used
+    return user.is_staff or _has_role_iexact(user, 'Teacher')
+
+
+def is_student(user):
+    return _has_role_iexact(user, 'Student')
+
+
+def _generation(user_id):
+    values = cache.get_many([GLOBAL_GENERATION_KEY, _user_generation_key(user_id)])
+    return [values.get(GLOBAL_GENERATION_KEY), values.get(_user_generation_key(user_id))]
+
+
+class RoleMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        write_back = self._load(request)
+        response = self.get_response(request)
+        if write_back:
+            self._store(request)
+        return response
+
+    async def __acall__(self, request):
+        if not self._enabled(request):
+            return await self.get_response(request)
+        # async views read request.auser(); make request.user that same instance so the
+        # restored roles land on the object they check
+        request.user = await request.auser()
+        # session lookups are sync-only; don't hop threads when the cache is off
+        write_back = await sync_to_async(self._load)(request)
+        response = await self.get_response(request)
+        if write_back:
+            await sync_to_async(self._store)(request)
+        return response
+
+    @staticmethod
+    def _enabled(request):
+        return getattr(settings, 'ROLE_SESSION_CACHE', False) and hasattr(request, 'session')
+
+    def _load(self, request):
+        """Restore the session copy if it is current; True if it must be written back."""
+        if not self._enabled(request):
+            return False
+        stored = request.session.get(SESSION_KEY)
+        if stored and request.user.is_authenticated and stored['user'] == request.user.pk \
+                and stored['generation'] == _generation(request.user.pk):
+            request.user._roles_cache = frozenset(stored['roles'])
+            return False  # session copy is current, nothing to write back
+        return True
+
+    def _store(self, request):
+        user = request.user
+        roles = getattr(user, '_roles_cache', None) if user.is_authenticated else None
+        if roles is not None:
+            request.session[SESSION_KEY] = {
+                'user': user.pk, 'roles': sorted(roles), 'generation': _generation(user.pk),
+            }
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    stamp = time.time_ns()
+    if not reverse:
+        instance.__dict__.pop('_roles_cache', None)
+        cache.set(_user_generation_key(instance.pk), stamp, None)
+    elif pk_set:
+        cache.set_many({_user_generation_key(pk): stamp for pk in pk_set}, None)
+    else:
+        # group.user_set.clear(): the affected users are unknown
+        cache.set(GLOBAL_GENERATION_KEY, stamp, None)
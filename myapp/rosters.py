@@ -0,0 +1,59 @@
+"""Cached per-subject student rosters.
+
+A subject's roster is its ``Enrollment(role='student')`` rows, so progress work scales
+with class size. Works with any Django cache backend, including the default locmem one.
+Rosters are invalidated by Enrollment saves/deletes (user deletion cascades into those).
+Those signals only reach this process's cache, and bulk writes send none, so every
+entry also expires after ROSTER_TIMEOUT seconds. Code that writes a row per student
+passes ``fresh=True`` and reads the roster from the database instead.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+GENERATION_KEY = 'roster:gen'
+ROSTER_TIMEOUT = 60
+
+
+def _roster_key(subject_id):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, ROSTER_TIMEOUT)
+        generation = cache.get(GENERATION_KEY, generation)
+    return f'roster:{generation}:{subject_id}'
+
+
+def student_ids(subject_id, fresh=False):
+    """Ids of the students enrolled in ``subject_id``; read from the database with ``fresh``."""
+    key = _roster_key(subject_id)
+    ids = None if fresh else cache.get(key)
+    if ids is None:
+        from .models import Enrollment
+        ids = frozenset(Enrollment.objects.filter(subject_id=subject_id, role='student')
+                        .values_list('user_id', flat=True))
+        cache.set(key, ids, ROSTER_TIMEOUT)
+    return ids
+
+
+def student_count(subject_id):
+    return len(student_ids(subject_id))
+
+
+def is_enrolled(subject_id, user_id):
+    return user_id in student_ids(subject_id)
+
+
+def invalidate_rosters(subject_id=None):
+    if subject_id is None:
+        cache.set(GENERATION_KEY, time.time_ns(), ROSTER_TIMEOUT)
+    else:
+        cache.delete(_roster_key(subject_id))
+
+
+@receiver(post_save, sender='myapp.Enrollment')
+@receiver(post_delete, sender='myapp.Enrollment')
+def roster_enrollment_changed(sender, instance, **kwargs):
+    invalidate_rosters(instance.subject_id)
@@ -0,0 +1,47 @@
+"""Background job tasks for myapp/jobs.py, registered when the app is ready."""
+from io import StringIO
+
+from django.core.management import call_command as run_command
+from django.template.loader import render_to_string
+
+from . import events, forecast
+from .jobs import task
+from .models import Chapter, Subject
+
+# management commands that may run as jobs, e.g. ``seed_scale --background``
+COMMANDS = ('seed_scale', 'seed_demo', 'compact_progress', 'refresh_forecasts', 'rebuild_rollups')
+MAX_OUTPUT_LENGTH = 4000
+
+
+def report_context(subject):
+    return {'subject': subject,
+            'chapters': Chapter.objects.filter(subject=subject).prefetch_related('topics__status')}
+
+
+@task(max_attempts=5)
+def compact_progress():
+    """Fold the progress event log in; queued by deferred topic toggles."""
+    return events.compact()
+
+
+@task()
+def refresh_forecasts(subject_ids=None, force=False):
+    subjects = None if subject_ids is None else Subject.objects.filter(pk__in=subject_ids)
+    return {'refreshed': forecast.refresh(subjects, force=force)}
+
+
+@task()
+def render_subject_report(subject_id):
+    """The subject_report body; job_result serves it inside the page."""
+    subject = Subject.objects.get(pk=subject_id)
+    return {'subject_id': subject_id, 'html': render_to_string('_report_body.html', report_context(subject))}
+
+
+@task(max_attempts=1)
+def call_command(command, options=None):
+    """Run one of COMMANDS; not retried, since seeding isn't idempotent."""
+    if command not in COMMANDS:
+        raise ValueError(f'{command!r} may not run as a job')
+    out = StringIO()
+    run_command(command, stdout=out, **(options or {}))
+    return {'output': out.getvalue()[-MAX_OUTPUT_LENGTH:]}
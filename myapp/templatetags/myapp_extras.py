@@ -1,5 +1,6 @@
 from django import template
-from myapp.views import _is_teacher, _is_student
+from myapp import partials
+from myapp.roles import is_teacher as _is_teacher, is_student as _is_student
 
 register = template.Library()
 
@@ -9,4 +10,9 @@ def is_teacher(user):
 
 @register.filter
 def is_student(user):
-    return _is_student(user)
\ No newline at end of file
+    return _is_student(user)
+
+@register.simple_tag
+def topic_row(t, is_teacher):
+    """_topic_row.html through the Python fast path (see myapp/partials.py)."""
+    return partials.topic_row(t, is_teacher)
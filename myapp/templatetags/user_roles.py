@@ -1,5 +1,5 @@
 from django import template
-from django.contrib.auth.models import Group
+from myapp.roles import has_role
 
 register = template.Library()
 
@@ -9,7 +9,7 @@ def is_teacher(user):
     Template filter to check if a user is in the teacher group
     Usage: {% if user|is_teacher %}
     """
-    return user.groups.filter(name='Teacher').exists()
+    return has_role(user, 'Teacher')
 
 @register.filter(name='is_student')
 def is_student(user):
@@ -17,4 +17,4 @@ def is_student(user):
     Template filter to check if a user is in the student group
     Usage: {% if user|is_student %}
     """
-    return user.groups.filter(name='Student').exists()
\ No newline at end of file
+    return has_role(user, 'Student')
\ No newline at end of file
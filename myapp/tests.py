@@ -1,3 +1,1275 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import (attendance, benchmarks, events, forecast, fragments, imports, jobs, pagination, partials, progress,
+               pubsub, roles, rosters, timings, views)
+from .templatetags import myapp_extras, user_roles
+from .models import (Subject, Chapter, Topic, TopicStatus, LectureSession, Enrollment, TopicProgress,
+                     SubjectProgressRollup, SubjectForecast, ProgressEvent, SubjectProgressSnapshot, Job)
+
+
+class RollupTests(TestCase):
+    """SubjectProgressRollup follows every write path without a recount."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name='Compilers')
+        cls.other = Subject.objects.create(name='Networks')
+        cls.student = User.objects.create(username='student')
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+        Enrollment.objects.create(user=cls.student, subject=cls.other, role='student')
+        cls.chapter = Chapter.objects.create(subject=cls.subject, title='Parsing', order=1)
+        cls.elsewhere = Chapter.objects.create(subject=cls.other, title='Routing', order=1)
+        cls.topic = Topic.objects.create(chapter=cls.chapter, title='LL(1)', order=1)
+
+    def counts(self, subject=None):
+        rollup = SubjectProgressRollup.objects.get(subject=subject or self.subject)
+        return {field: getattr(rollup, field) for field in SubjectProgressRollup.COUNT_FIELDS}
+
+    def assertMatchesRecount(self):
+        for subject in (self.subject, self.other):
+            self.assertEqual(self.counts(subject), SubjectProgressRollup.compute([subject.pk])[subject.pk])
+
+    def test_create_update_delete(self):
+        self.assertEqual(self.counts()['topic_count'], 1)
+        row = TopicProgress.objects.create(student=self.student, topic=self.topic, status='in_progress')
+        self.assertEqual(self.counts()['in_progress_count'], 1)
+        row = TopicProgress.objects.get(pk=row.pk)
+        row.status = 'completed'
+        row.save()
+        self.assertEqual((self.counts()['in_progress_count'], self.counts()['completed_count']), (0, 1))
+        row.delete()
+        self.assertEqual(self.counts()['completed_count'], 0)
+        Topic.objects.create(chapter=self.chapter, title='LR(1)', order=2).delete()
+        self.assertMatchesRecount()
+
+    def test_unenrolled_rows_do_not_count(self):
+        outsider = User.objects.create(username='outsider')
+        TopicProgress.objects.create(student=outsider, topic=self.topic, status='completed')
+        self.assertEqual(self.counts()['completed_count'], 0)
+        Enrollment.objects.create(user=outsider, subject=self.subject, role='student')
+        self.assertEqual((self.counts()['completed_count'], self.counts()['student_count']), (1, 2))
+
+    def test_moving_a_topic_or_chapter_recounts_both_subjects(self):
+        TopicProgress.objects.create(student=self.student, topic=self.topic, status='completed')
+        topic = Topic.objects.get(pk=self.topic.pk)
+        topic.chapter = self.elsewhere
+        topic.save()
+        self.assertEqual((self.counts()['topic_count'], self.counts(self.other)['topic_count']), (0, 1))
+        self.assertEqual((self.counts()['completed_count'], self.counts(self.other)['completed_count']), (0, 1))
+        self.assertEqual(TopicProgress.objects.get().subject, self.other)
+        self.assertMatchesRecount()
+        # saved without being loaded first
+        Chapter(pk=self.elsewhere.pk, subject=self.subject, title='Routing', order=1).save()
+        self.assertEqual((self.counts()['topic_count'], self.counts(self.other)['topic_count']), (1, 0))
+        self.assertEqual(TopicProgress.objects.get().subject, self.subject)
+        self.assertMatchesRecount()
+
+    def test_bulk_writes_and_rebuild(self):
+        topics = Topic.objects.bulk_create(Topic(chapter=self.chapter, title=f'Bulk {i}', order=i) for i in range(3))
+        TopicProgress.objects.bulk_create(
+            TopicProgress(student=self.student, topic=t, subject=self.subject, status='completed') for t in topics)
+        self.assertEqual(self.counts()['topic_count'], 1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', '--check', stdout=StringIO())
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual((self.counts()['topic_count'], self.counts()['completed_count']), (4, 3))
+        self.assertMatchesRecount()
+
+
+class FanOutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name='Operating systems')
+        chapter = Chapter.objects.create(subject=cls.subject, title='Scheduling', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='Round robin', order=1)
+        cls.students = [User.objects.create(username=f'stu{i}') for i in range(5)]
+        for student in cls.students:
+            Enrollment.objects.create(user=student, subject=cls.subject, role='student')
+        User.objects.create(username='not-enrolled')
+
+    def inserts(self, queries):
+        return [q for q in queries if q['sql'].startswith('INSERT INTO "myapp_topicprogress"')]
+
+    def test_one_upsert_per_batch_of_enrolled_students(self):
+        with mock.patch.object(progress, 'BATCH_SIZE', 2), CaptureQueriesContext(connection) as ctx:
+            result = progress.propagate_topic_status(self.topic, True)
+        self.assertEqual((result['students'], result['rows_written']), (5, 5))
+        self.assertEqual(len(self.inserts(ctx.captured_queries)), 3)
+        self.assertEqual(set(TopicProgress.objects.values_list('student', 'status')),
+                         {(s.pk, 'completed') for s in self.students})
+        self.assertEqual(SubjectProgressRollup.objects.get(subject=self.subject).completed_count, 5)
+
+    def test_repeat_updates_rows_in_place(self):
+        progress.propagate_topic_status(self.topic, True)
+        with mock.patch.object(progress, 'BATCH_SIZE', 10), CaptureQueriesContext(connection) as ctx:
+            progress.propagate_topic_status(self.topic, False)
+        self.assertEqual(len(self.inserts(ctx.captured_queries)), 1)
+        self.assertEqual(TopicProgress.objects.count(), 5)
+        rollup = SubjectProgressRollup.objects.get(subject=self.subject)
+        self.assertEqual((rollup.completed_count, rollup.in_progress_count), (0, 5))
+
+
+class ProgressStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('sam')
+        cls.student.groups.add(Group.objects.create(name='Student'))
+        cls.subject = Subject.objects.create(name='Compilers')
+        cls.foreign = Subject.objects.create(name='Networks')
+        chapter = Chapter.objects.create(subject=cls.subject, title='Parsing', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='LL(1)', order=1)
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+
+    def test_broker_delivers_to_subscribers_of_the_channel(self):
+        async def scenario():
+            broker = pubsub.LocalBroker()
+            async with broker.subscribe('a', 'b') as queue:
+                self.assertEqual(broker.publish('b', 1), 1)
+                self.assertEqual(broker.publish('c'), 0)
+                self.assertEqual(await asyncio.wait_for(queue.get(), 1), ('b', 1))
+                self.assertTrue(queue.empty())
+            self.assertEqual(broker.publish('a'), 0)
+        asyncio.run(scenario())
+
+    def test_rollup_changes_publish_on_commit(self):
+        with mock.patch.object(pubsub.get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                TopicProgress.objects.create(student=self.student, topic=self.topic, status='completed')
+                publish.assert_not_called()
+        publish.assert_called_once_with(pubsub.subject_channel(self.subject.pk))
+
+    async def test_stream_sends_changed_fragments(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        response = await client.get(reverse('progress_stream'), {'s': [self.subject.pk]})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            first = (await anext(stream)).decode()
+            self.assertIn(f'event: progress-{self.subject.pk}', first)
+            self.assertIn('progress-percent">0%<', first)
+            await TopicProgress.objects.acreate(student=self.student, topic=self.topic, status='completed')
+            pubsub.get_broker().publish(pubsub.subject_channel(self.subject.pk))
+            self.assertIn(b'progress-percent">100.0%<', await asyncio.wait_for(anext(stream), 5))
+        finally:
+            await stream.aclose()
+
+    async def test_only_the_users_own_subjects(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        response = await client.get(reverse('progress_stream'), {'s': [self.foreign.pk]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_refused_under_wsgi(self):
+        # a WSGI worker would have to drain the endless stream before sending a byte
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('progress_stream'), {'s': [self.subject.pk]})
+        self.assertEqual(response.status_code, 400)
+
+
+class SubjectConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Databases', teacher=cls.teacher)
+        cls.foreign = Subject.objects.create(name='Networks')
+        Chapter.objects.create(subject=cls.subject, title='Indexes', order=1)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.url = reverse('subject_detail', args=[self.subject.pk])
+
+    def test_not_modified_until_a_write(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.client.post(reverse('add_session', args=[self.subject.pk]), {'attendees': '12'})
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pending_messages_skip_the_conditional_response(self):
+        etag = self.client.get(self.url)['ETag']
+        # refused: queues an error message for the next page
+        self.client.post(reverse('add_session', args=[self.foreign.pk]), {'attendees': '12'})
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class ProgressBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('sam')
+        cls.student.groups.add(Group.objects.create(name='Student'))
+        cls.subjects = [Subject.objects.create(name=f'Subject {i}') for i in range(4)]
+        for subject in cls.subjects:
+            Enrollment.objects.create(user=cls.student, subject=subject, role='student')
+            chapter = Chapter.objects.create(subject=subject, title='Intro', order=1)
+            topic = Topic.objects.create(chapter=chapter, title='Welcome', order=1)
+            TopicProgress.objects.create(student=cls.student, topic=topic, status='completed')
+        cls.foreign = Subject.objects.create(name='Not enrolled')
+
+    def setUp(self):
+        self.client.force_login(self.student)
+        self.url = reverse('progress_batch')
+
+    def queries(self, data):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url, data).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_out_of_band_fragments_for_dashboard_subjects(self):
+        html = self.client.get(self.url).content.decode()
+        for subject in self.subjects:
+            self.assertIn(f'<div id="progress-{subject.pk}" hx-swap-oob="innerHTML">', html)
+        self.assertNotIn(f'progress-{self.foreign.pk}', html)
+
+    def test_json_for_picked_subjects(self):
+        picked = [self.subjects[0].pk, self.foreign.pk]
+        data = self.client.get(self.url, {'s': picked, 'format': 'json'}).json()['subjects']
+        self.assertEqual(list(data), [str(self.subjects[0].pk)])
+        self.assertEqual(data[str(self.subjects[0].pk)]['progress_percent'], 100.0)
+        self.assertEqual(self.client.get(self.url, {'s': 'x'}).status_code, 400)
+
+    def test_query_count_does_not_grow_with_subjects(self):
+        self.assertEqual(self.queries({'s': [self.subjects[0].pk]}),
+                         self.queries({'s': [s.pk for s in self.subjects]}))
+
+
+class SubjectStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        students = [User.objects.create(username=f'stu{i}') for i in range(2)]
+        for i in range(3):
+            subject = Subject.objects.create(name=f'Subject {i}', planned_lectures=10)
+            for student in students:
+                Enrollment.objects.create(user=student, subject=subject, role='student')
+            topic = Topic.objects.create(chapter=Chapter.objects.create(subject=subject, title='Intro'), title='T')
+            for j in range(i):
+                LectureSession.objects.create(subject=subject, attendees=2)
+            TopicProgress.objects.create(student=students[0], topic=topic, status='completed')
+            TopicProgress.objects.create(student=students[1], topic=topic, status='in_progress')
+        Subject.objects.create(name='Empty', planned_lectures=10)
+
+    def test_one_query_for_the_listing(self):
+        with self.assertNumQueries(1):
+            rows = {s.name: (s.conducted_lectures, s.remaining_lectures, s.topic_total, s.progress_percent)
+                    for s in Subject.objects.with_stats()}
+        self.assertEqual(rows['Subject 2'], (2, 8, 1, 75.0))
+        self.assertEqual(rows['Empty'], (0, 10, 0, 0.0))
+
+    def test_annotations_match_the_properties(self):
+        for subject in Subject.objects.with_stats():
+            plain = Subject.objects.get(pk=subject.pk)
+            self.assertEqual((subject.conducted_lectures, subject.progress_percent),
+                             (plain.conducted_lectures, plain.progress_percent), subject.name)
+
+
+class RoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.lower = User.objects.create_user('lower')
+        cls.lower.groups.add(Group.objects.create(name='teacher'))
+
+    def test_resolved_once_per_user_instance(self):
+        user = User.objects.get(pk=self.teacher.pk)
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertTrue(roles.is_teacher(user))
+                self.assertFalse(roles.is_student(user))
+                self.assertTrue(user_roles.is_teacher(user))
+        user.groups.add(Group.objects.create(name='Student'))
+        self.assertTrue(roles.is_student(user))
+
+    def test_views_match_case_insensitively_filters_exactly(self):
+        user = User.objects.get(pk=self.lower.pk)
+        self.assertTrue(roles.is_teacher(user))
+        self.assertTrue(myapp_extras.is_teacher(user))
+        self.assertFalse(user_roles.is_teacher(user))
+
+    def test_session_copy_skips_the_group_query(self):
+        self.client.force_login(self.teacher)
+        with self.settings(ROLE_SESSION_CACHE=True):
+            self.client.get(reverse('home'))
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertRedirects(self.client.get(reverse('home')), reverse('teacher_dashboard'),
+                                     fetch_redirect_response=False)
+            self.assertFalse([q for q in ctx.captured_queries if 'auth_group' in q['sql']])
+            self.teacher.groups.clear()
+            self.assertRedirects(self.client.get(reverse('home')), reverse('student_dashboard'),
+                                 fetch_redirect_response=False)
+
+
+class RosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name='Graphics')
+        cls.students = [User.objects.create(username=f'stu{i}') for i in range(3)]
+        Enrollment.objects.create(user=cls.students[0], subject=cls.subject, role='student')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_an_enrollment_changes(self):
+        self.assertEqual(rosters.student_ids(self.subject.pk), {self.students[0].pk})
+        with self.assertNumQueries(0):
+            self.assertTrue(rosters.is_enrolled(self.subject.pk, self.students[0].pk))
+        enrollment = Enrollment.objects.create(user=self.students[1], subject=self.subject, role='student')
+        self.assertEqual(rosters.student_count(self.subject.pk), 2)
+        enrollment.delete()
+        self.assertFalse(rosters.is_enrolled(self.subject.pk, self.students[1].pk))
+
+    def test_bulk_writes_need_fresh_reads_or_invalidation(self):
+        rosters.student_ids(self.subject.pk)
+        Enrollment.objects.bulk_create([Enrollment(user=self.students[2], subject=self.subject, role='student')])
+        self.assertEqual(rosters.student_count(self.subject.pk), 1)
+        self.assertEqual(len(rosters.student_ids(self.subject.pk, fresh=True)), 2)
+        Enrollment.objects.filter(user=self.students[2]).delete()
+        rosters.invalidate_rosters()
+        self.assertEqual(rosters.student_count(self.subject.pk), 1)
+
+    def test_entries_expire(self):
+        with mock.patch.object(rosters.cache, 'set', wraps=rosters.cache.set) as cache_set:
+            rosters.student_ids(self.subject.pk)
+            rosters.invalidate_rosters()
+        self.assertTrue(cache_set.call_args_list)
+        for call in cache_set.call_args_list:
+            self.assertEqual(call.args[2], rosters.ROSTER_TIMEOUT)
+
+
+class EnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = [Subject.objects.create(name=f'Sem 1 subject {i}', class_name='SEM-1') for i in range(2)]
+        cls.second = Subject.objects.create(name='Sem 2 subject', class_name='SEM-2')
+
+    def signup(self, **fields):
+        data = {'username': 'newbie', 'email': 'newbie@example.com', 'role': 'student',
+                'password1': 'a-long-passphrase', 'password2': 'a-long-passphrase', **fields}
+        return self.client.post(reverse('signup'), data)
+
+    def test_students_sign_up_into_their_class(self):
+        self.assertRedirects(self.signup(class_name='SEM-1'), reverse('home'), fetch_redirect_response=False)
+        user = User.objects.get(username='newbie')
+        self.assertEqual(set(Enrollment.objects.filter(user=user).values_list('subject', flat=True)),
+                         {s.pk for s in self.first})
+        self.assertEqual(SubjectProgressRollup.objects.get(subject=self.first[0]).student_count, 1)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, 'Sem 1 subject 0')
+        self.assertNotContains(response, 'Sem 2 subject')
+
+    def test_students_must_pick_a_class(self):
+        self.assertContains(self.signup(), 'Choose your class.')
+        self.assertContains(self.signup(class_name='SEM-9'), 'Select a valid choice')
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+
+    def test_teachers_are_not_enrolled(self):
+        self.signup(role='teacher', class_name='SEM-1')
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_progress_only_counts_enrolled_students(self):
+        topic = Topic.objects.create(chapter=Chapter.objects.create(subject=self.second, title='C'), title='T')
+        enrolled, other = User.objects.create(username='in'), User.objects.create(username='out')
+        Enrollment.objects.create(user=enrolled, subject=self.second, role='student')
+        Enrollment.objects.create(user=other, subject=self.first[0], role='student')
+        progress.propagate_topic_status(topic, True)
+        self.assertEqual(list(TopicProgress.objects.values_list('student', flat=True)), [enrolled.pk])
+        self.assertEqual(SubjectProgressRollup.objects.get(subject=self.second).student_count, 1)
+
+
+class IndexUsageTests(TestCase):
+    """EXPLAIN the hot progress/session filters and check they hit the composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(username='student')
+        cls.subject = Subject.objects.create(name='Algorithms')
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+        chapter = Chapter.objects.create(subject=cls.subject, title='Sorting', order=1)
+        for i in range(5):
+            topic = Topic.objects.create(chapter=chapter, title=f'Topic {i}', order=i)
+            TopicProgress.objects.create(student=cls.student, topic=topic, status='completed')
+        LectureSession.objects.create(subject=cls.subject, attendees=10)
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # tiny test tables would otherwise always be sequentially scanned
+                cursor.execute('SET enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'EXPLAIN format not checked on {connection.vendor}')
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan)
+
+    def test_student_progress_uses_student_subject_index(self):
+        qs = (TopicProgress.objects.filter(student=self.student, subject=self.subject)
+              .order_by().values('status').annotate(n=Count('id')))
+        self.assertUsesIndex(qs, 'progress_student_subject_idx')
+
+    def test_class_progress_uses_subject_status_index(self):
+        qs = TopicProgress.objects.filter(subject=self.subject).order_by().values('status').annotate(n=Count('id'))
+        self.assertUsesIndex(qs, 'progress_subject_status_idx')
+
+    def test_recent_sessions_use_subject_date_index(self):
+        self.assertUsesIndex(self.subject.sessions.all()[:10], 'session_subject_date_idx')
+
+    def test_chapters_use_subject_order_index(self):
+        self.assertUsesIndex(Chapter.objects.filter(subject=self.subject), 'chapter_subject_order_idx')
+
+    def test_teacher_dashboard_pages_use_keyset_index(self):
+        teacher = User.objects.create(username='teacher')
+        qs = pagination.after(Subject.objects.filter(teacher=teacher), pagination.encode_cursor(self.subject))[:25]
+        self.assertUsesIndex(qs, 'subject_teacher_keyset_idx')
+
+    def test_event_log_cascades_use_foreign_key_indexes(self):
+        topic = Topic.objects.first()
+        for field, value in (('subject', self.subject), ('topic', topic), ('student', self.student),
+                             ('actor', self.student)):
+            with self.subTest(field=field):
+                self.assertUsesIndex(ProgressEvent.objects.filter(**{field: value}), f'progressevent_{field}_id')
+
+    def test_progress_rows_carry_their_subject(self):
+        self.assertFalse(TopicProgress.objects.exclude(subject=self.subject).exists())
+
+
+class SeedScaleTests(TestCase):
+    SIZE = ['--subjects', '2', '--chapters', '2', '--topics', '3', '--students', '4', '--sessions', '2',
+            '--batch-size', '5']
+
+    def seed(self, prefix, seed=7):
+        call_command('seed_scale', *self.SIZE, '--prefix', prefix, '--seed', str(seed), stdout=StringIO())
+        return list(TopicProgress.objects.filter(subject__name__startswith=f'{prefix}-')
+                    .order_by('subject__name', 'topic__chapter__order', 'topic__order', 'student__username')
+                    .values_list('status', flat=True))
+
+    def test_row_counts_and_rollups(self):
+        statuses = self.seed('a')
+        self.assertEqual(len(statuses), 2 * 2 * 3 * 4)
+        self.assertEqual(Enrollment.objects.filter(subject__name__startswith='a-').count(), 2 * 4)
+        for rollup in SubjectProgressRollup.objects.filter(subject__name__startswith='a-'):
+            self.assertEqual(rollup.student_count, 4)
+            self.assertEqual(rollup.topic_count, 6)
+            self.assertEqual(rollup.completed_count + rollup.in_progress_count + rollup.not_started_count, 24)
+
+    def test_same_seed_same_data(self):
+        self.assertEqual(self.seed('a'), self.seed('b'))
+        self.assertNotEqual(self.seed('c', seed=8), self.seed('d', seed=9))
+
+
+class ProgressExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Networks', teacher=cls.teacher)
+        chapter = Chapter.objects.create(subject=cls.subject, title='Layers', order=1)
+        cls.t1 = Topic.objects.create(chapter=chapter, title='Physical', order=1)
+        cls.t2 = Topic.objects.create(chapter=chapter, title='Link', order=2)
+        for name in ('ann', 'ben'):
+            student = User.objects.create(username=name)
+            Enrollment.objects.create(user=student, subject=cls.subject, role='student')
+        TopicProgress.objects.create(student=User.objects.get(username='ann'), topic=cls.t2, status='completed')
+        dropped = User.objects.create(username='dropped')
+        TopicProgress.objects.create(student=dropped, topic=cls.t1, status='completed')
+
+    def test_csv_pivots_enrolled_students(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('export_progress', args=[self.subject.pk]))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'student,Layers / Physical,Layers / Link',
+            'ann,not_started,completed',
+            'ben,not_started,not_started',
+        ])
+
+    def test_jsonl_is_gzipped_when_accepted(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('export_progress', args=[self.subject.pk]), {'format': 'jsonl'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([t['id'] for t in json.loads(lines[0])['topics']], [self.t1.pk, self.t2.pk])
+        self.assertEqual(json.loads(lines[1]), {'student': 'ann', 'statuses': ['not_started', 'completed']})
+        self.assertEqual(len(lines), 3)
+
+    def test_command_writes_csv(self):
+        out = StringIO()
+        call_command('export_progress', self.subject.pk, stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[1], 'ann,not_started,completed')
+
+
+class RecordImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Compilers', teacher=cls.teacher)
+        cls.other = Subject.objects.create(name='Graphics')
+        chapter = Chapter.objects.create(subject=cls.subject, title='Parsing', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='LL(1)', order=1)
+        cls.student = User.objects.create(username='ann')
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+        cls.session = LectureSession.objects.create(subject=cls.subject, attendees=3)
+
+    def upload(self, kind, name, body):
+        self.client.force_login(self.teacher)
+        return self.client.post(reverse('import_records'), {
+            'kind': kind, 'file': SimpleUploadedFile(name, body.encode()),
+        }).json()
+
+    def test_progress_csv_upserts_and_rejects(self):
+        TopicProgress.objects.create(student=self.student, topic=self.topic, status='not_started')
+        report = self.upload('progress', 'progress.csv', '\n'.join([
+            'student,topic_id,status',
+            f'ann,{self.topic.pk},completed',
+            f'ann,999,completed',
+            f'bob,{self.topic.pk},completed',
+            f'ann,{self.topic.pk},done',
+        ]))
+        self.assertEqual((report['read'], report['written'], report['rejected']), (4, 1, 3))
+        self.assertEqual([r['line'] for r in report['rejects']], [3, 4, 5])
+        self.assertEqual(TopicProgress.objects.get().status, 'completed')
+        self.assertEqual(SubjectProgressRollup.objects.get(subject=self.subject).completed_count, 1)
+
+    def test_sessions_jsonl_updates_and_inserts(self):
+        report = self.upload('sessions', 'sessions.jsonl', '\n'.join([
+            json.dumps({'id': self.session.pk, 'subject_id': self.subject.pk, 'date': '2025-01-10', 'attendees': 9}),
+            json.dumps({'subject_id': self.subject.pk, 'date': '2025-01-12', 'attendees': 7, 'notes': 'lab'}),
+            json.dumps({'subject_id': self.other.pk, 'date': '2025-01-12', 'attendees': 7}),
+            '{not json',
+        ]))
+        self.assertEqual((report['written'], report['rejected']), (2, 2))
+        self.assertEqual(sorted(self.subject.sessions.values_list('attendees', flat=True)), [7, 9])
+
+    def test_command_reports_rows(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'progress.csv')
+            with open(path, 'w') as fh:
+                fh.write(f'student_id,topic_id,status\n{self.student.pk},{self.topic.pk},in_progress\n')
+            call_command('import_records', 'progress', path, stdout=out)
+        self.assertIn('1 written, 0 rejected of 1 rows', out.getvalue())
+
+
+class ChapterTreeCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.subject = Subject.objects.create(name='Databases', teacher=cls.teacher)
+        cls.chapter = Chapter.objects.create(subject=cls.subject, title='Indexes', order=1)
+        for i in range(5):
+            topic = Topic.objects.create(chapter=cls.chapter, title=f'B-tree {i}', order=i)
+            TopicStatus.objects.create(topic=topic, completed=True, updated_by=cls.teacher)
+
+    def setUp(self):
+        cache.clear()
+
+    def tree(self, is_teacher=True):
+        # as subject_detail loads it: the joined rollup row carries the version
+        return fragments.chapter_tree(Subject.objects.select_related('rollup').get(pk=self.subject.pk), is_teacher)
+
+    def test_rebuild_prefetches_updaters(self):
+        subject = Subject.objects.select_related('rollup').get(pk=self.subject.pk)
+        with self.assertNumQueries(2):
+            html = fragments.chapter_tree(subject, True)
+        self.assertEqual(html.count('by teacher'), 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(fragments.chapter_tree(subject, True), html)
+
+    def test_edits_move_the_version(self):
+        before = self.tree()
+        self.chapter.title = 'Hash indexes'
+        self.chapter.save()
+        self.assertIn('Hash indexes', self.tree())
+        topic = Topic.objects.create(chapter=self.chapter, title='GiST', order=9)
+        self.assertIn('GiST', self.tree())
+        TopicStatus.objects.filter(topic__title='B-tree 0').get().delete()
+        self.assertNotEqual(self.tree(), before)
+        # a toggle's UPDATE skips the TopicStatus receivers
+        progress.propagate_topic_status(topic, True, self.teacher)
+        self.assertEqual(self.tree().count('by teacher'), 5)
+
+    def test_version_is_shared_through_the_database(self):
+        self.tree()
+        # as another process would: no signal reaches this one's cache
+        SubjectProgressRollup.objects.filter(subject=self.subject).update(version=F('version') + 1)
+        Chapter.objects.filter(pk=self.chapter.pk).update(title='Renamed elsewhere')
+        self.assertIn('Renamed elsewhere', self.tree())
+
+    def test_student_markup_is_cached_separately(self):
+        self.assertIn('/toggle/', self.tree(True))
+        self.assertNotIn('/toggle/', self.tree(False))
+
+
+def _squash(html):
+    html = re.sub(r'\s+', ' ', str(html))
+    return re.sub(r'\s*(<|>)\s*', r'\1', html).strip()
+
+
+class PartialRenderTests(TestCase):
+    """partials.py must keep producing the markup of the templates it replaces."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('o\'brien')
+        subject = Subject.objects.create(name='Security')
+        chapter = Chapter.objects.create(subject=subject, title='Web', order=1)
+        cls.done = Topic.objects.create(chapter=chapter, title='<script> & XSS', order=1)
+        TopicStatus.objects.create(topic=cls.done, completed=True, updated_by=cls.teacher)
+        cls.pending = Topic.objects.create(chapter=chapter, title='CSRF', order=2)
+
+    def test_topic_row_matches_template(self):
+        for topic in (Topic.objects.get(pk=self.done.pk), Topic.objects.get(pk=self.pending.pk)):
+            for is_teacher in (True, False):
+                with self.subTest(topic=topic.title, is_teacher=is_teacher):
+                    expected = render_to_string('myapp/_topic_row.html', {'t': topic, 'is_teacher': is_teacher})
+                    self.assertEqual(_squash(partials.topic_row(topic, is_teacher)), _squash(expected))
+
+    def test_progress_bar_matches_template(self):
+        for context in ({}, {'progress_percent': 0.0, 'completed_topics': 0},
+                        {'progress_percent': 42.5, 'completed_topics': 3, 'in_progress_topics': 1,
+                         'remaining_topics': 12}):
+            with self.subTest(context=context):
+                expected = render_to_string('myapp/_progress_bar.html', context)
+                self.assertEqual(_squash(partials.progress_bar(context)), _squash(expected))
+
+    def test_benchmark_samples_render_the_same_both_ways(self):
+        # measure_partials compares the speed of the two paths on these; they must agree on the markup
+        rows, bars = benchmarks.partial_samples(20)
+        for topic in rows:
+            expected = render_to_string('myapp/_topic_row.html', {'t': topic, 'is_teacher': True})
+            self.assertEqual(_squash(partials.topic_row(topic, True)), _squash(expected), topic.title)
+        for context in bars:
+            expected = render_to_string('myapp/_progress_bar.html', context)
+            self.assertEqual(_squash(partials.progress_bar(context)), _squash(expected), context)
+
+
+class AsyncViewTests(TestCase):
+    """The read-only polling views run natively under ASGI, without a thread per request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('sam')
+        cls.student.groups.add(Group.objects.create(name='Student'))
+        cls.subject = Subject.objects.create(name='Compilers')
+        chapter = Chapter.objects.create(subject=cls.subject, title='Parsing', order=1)
+        topics = [Topic.objects.create(chapter=chapter, title=f'T{i}', order=i) for i in range(4)]
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+        TopicProgress.objects.create(student=cls.student, topic=topics[0], status='completed')
+        TopicProgress.objects.create(student=cls.student, topic=topics[1], status='in_progress')
+
+    def test_views_and_middleware_are_async(self):
+        for view in (views.progress_partial, views.subject_detail, views.teacher_dashboard,
+                     views.student_dashboard):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
+    async def test_progress_partial_under_async_client(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        url = reverse('progress_partial', args=[self.subject.pk])
+        response = await client.get(url)
+        self.assertContains(response, '<div class="progress-percent">37.5%</div>')
+        response = await client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_student_pages_render(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        self.assertContains(await client.get(reverse('student_dashboard')), 'Compilers')
+        self.assertContains(await client.get(reverse('subject_detail', args=[self.subject.pk])), 'Parsing')
+
+    def test_measure_concurrency(self):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                body = b'ok' if 'sessionid=abc' in self.headers.get('Cookie', '') else b''
+                self.send_response(200 if body else 403)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_port}/poll/'
+        result = benchmarks.measure_concurrency(url, {'sessionid': 'abc'}, clients=4, requests=10)
+        self.assertEqual((result['requests'], result['errors']), (10, 0))
+        self.assertEqual(benchmarks.measure_concurrency(url, clients=2, requests=4)['errors'], 4)
+
+
+class TopicToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        subject = Subject.objects.create(name='Databases', teacher=cls.teacher)
+        chapter = Chapter.objects.create(subject=subject, title='Transactions', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='Isolation', order=1)
+        cls.student = User.objects.create(username='stu')
+        Enrollment.objects.create(user=cls.student, subject=subject, role='student')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.url = reverse('toggle_topic', args=[self.topic.pk])
+
+    def _state(self):
+        status = TopicStatus.objects.get(topic=self.topic)
+        row = TopicProgress.objects.get(student=self.student, topic=self.topic)
+        return status.completed, status.version, row.status
+
+    def test_double_submit_conflicts_instead_of_flipping_back(self):
+        response = self.client.post(self.url, {'completed': '1', 'version': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="version" value="1"')
+        response = self.client.post(self.url, {'completed': '1', 'version': '0'})
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'Completed', status_code=409)
+        self.assertEqual(self._state(), (True, 1, 'completed'))
+
+    def test_stale_version_leaves_everything_unchanged(self):
+        self.client.post(self.url, {'completed': '1', 'version': '0'})
+        self.client.post(self.url, {'completed': '0', 'version': '1'})
+        response = self.client.post(self.url, {'completed': '1', 'version': '1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self._state(), (False, 2, 'in_progress'))
+
+    def test_target_state_without_version_is_idempotent(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.url, {'completed': 'true'}).status_code, 200)
+        self.assertEqual(self._state()[::2], (True, 'completed'))
+
+    def test_bare_post_flips(self):
+        self.client.post(self.url)
+        self.client.post(self.url)
+        self.assertEqual(self._state(), (False, 2, 'in_progress'))
+
+
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.staff = User.objects.create_user('admin', is_staff=True)
+        cls.subject = Subject.objects.create(name='Optics', teacher=cls.teacher)
+
+    def setUp(self):
+        timings.reset()
+
+    def test_server_timing_header_counts_queries(self):
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('subject_detail', args=[self.subject.pk]))
+        header = response['Server-Timing']
+        self.assertIn(f'desc="{len(captured)} queries"', header)
+        self.assertRegex(header, r'tpl;dur=\d+\.\d, total;dur=\d+\.\d$')
+
+    async def test_async_views_are_timed(self):
+        client = AsyncClient()
+        await client.aforce_login(self.teacher)
+        response = await client.get(reverse('progress_partial', args=[self.subject.pk]))
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_stats_page_is_staff_only_and_lists_views(self):
+        self.client.force_login(self.teacher)
+        for _ in range(3):
+            self.client.get(reverse('progress_partial', args=[self.subject.pk]))
+        self.assertEqual(self.client.get(reverse('request_stats')).status_code, 302)
+
+        self.client.force_login(self.staff)
+        views = {v['name']: v for v in self.client.get(reverse('request_stats'), {'format': 'json'}).json()['views']}
+        self.assertEqual(views['progress_partial']['count'], 3)
+        self.assertEqual(sum(views['progress_partial']['buckets']), 3)
+        self.assertGreater(views['progress_partial']['queries_max'], 0)
+        self.assertContains(self.client.get(reverse('request_stats')), '<code>progress_partial</code>')
+
+
+class DashboardPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.student = User.objects.create_user('student')
+        cls.student.groups.add(Group.objects.create(name='Student'))
+        # same class_name for several subjects, so ties are broken by name
+        for class_name, name in [('B', 'Zoology'), ('A', 'Logic'), ('B', 'Botany'), ('A', 'Algebra'), ('C', 'Art')]:
+            subject = Subject.objects.create(name=name, class_name=class_name, teacher=cls.teacher)
+            Enrollment.objects.create(user=cls.student, subject=subject, role='student')
+        topic = Topic.objects.create(chapter=Chapter.objects.create(subject=Subject.objects.get(name='Algebra'),
+                                                                    title='Groups', order=1), title='Rings', order=1)
+        TopicProgress.objects.create(student=cls.student, topic=topic, status='completed')
+
+    def pages(self, url):
+        names, responses, cursor = [], [], None
+        while True:
+            response = self.client.get(url, {'cursor': cursor} if cursor else {})
+            responses.append(response)
+            names += re.findall(r'<h\d class="text-lg font-\w+">([^<]+)</h\d>', response.content.decode())
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                return names, responses
+
+    @override_settings(PROGRESS_SSE=True)
+    @mock.patch('myapp.pagination.PAGE_SIZE', 2)
+    def test_teacher_pages_in_keyset_order(self):
+        self.client.force_login(self.teacher)
+        names, responses = self.pages(reverse('teacher_dashboard'))
+        self.assertEqual(names, ['Algebra', 'Logic', 'Botany', 'Zoology', 'Art'])
+        self.assertEqual(len(responses), 3)
+        first, later = responses[0].content.decode(), responses[1].content.decode()
+        self.assertIn('sse-swap=', first)
+        self.assertIn('hx-trigger="revealed"', first)
+        self.assertNotIn('sse-swap=', later)
+        self.assertNotIn('<html', later)
+        self.assertIn('hx-trigger="every 60s"', later)
+        self.assertNotIn('hx-trigger="revealed"', responses[2].content.decode())
+
+    @mock.patch('myapp.pagination.PAGE_SIZE', 2)
+    def test_student_cards_carry_their_progress(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual([s.name for s in response.context['subjects']], ['Algebra', 'Logic'])
+        self.assertContains(response, '<div class="progress-percent">100.0%</div>')
+
+    @override_settings(PROGRESS_SSE=True)
+    @mock.patch('myapp.pagination.PAGE_SIZE', 2)
+    def test_stream_fallback_refreshes_the_streamed_page(self):
+        for user, url in ((self.teacher, 'teacher_dashboard'), (self.student, 'student_dashboard')):
+            with self.subTest(url=url):
+                self.client.force_login(user)
+                html = self.client.get(reverse(url)).content.decode()
+                ids = '&amp;'.join(f's={s.pk}' for s in Subject.objects.filter(name__in=['Algebra', 'Logic'])
+                                   .order_by('name'))
+                self.assertIn(f'hx-get="{reverse("progress_batch")}?{ids}"', html)
+
+    @override_settings(PROGRESS_SSE=False)
+    @mock.patch('myapp.pagination.PAGE_SIZE', 2)
+    def test_without_sse_the_first_page_polls(self):
+        for user, url in ((self.teacher, 'teacher_dashboard'), (self.student, 'student_dashboard')):
+            with self.subTest(url=url):
+                self.client.force_login(user)
+                html = self.client.get(reverse(url)).content.decode()
+                self.assertNotIn('sse-connect=', html)
+                self.assertNotIn('sse-swap=', html)
+                self.assertIn('hx-trigger="every 60s"', html)
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.student)
+        for cursor in ('nope', pagination.encode_cursor(Subject(name='x', class_name='y'))):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('student_dashboard'), {'cursor': cursor}).status_code, 400)
+
+
+class ForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.start = date(2026, 9, 1)
+        cls.subject = Subject.objects.create(name='Graphics', teacher=cls.teacher, start_date=cls.start,
+                                             end_date=date(2026, 10, 31), planned_lectures=10)
+        chapter = Chapter.objects.create(subject=cls.subject, title='Raster', order=1)
+        cls.topics = [Topic.objects.create(chapter=chapter, title=f'T{i}', order=i) for i in range(10)]
+        # one topic a week, each taught in one lecture
+        for week in range(4):
+            when = datetime(2026, 9, 8 + 7 * week, 10, tzinfo=dt_timezone.utc)
+            TopicStatus.objects.create(topic=cls.topics[week], completed=True)
+            TopicStatus.objects.filter(topic=cls.topics[week]).update(updated_at=when)
+            LectureSession.objects.create(subject=cls.subject, date=when.date(), attendees=5)
+        cls.today = date(2026, 10, 1)
+
+    def test_fits_weekly_pace_and_projects_late_finish(self):
+        result = forecast.compute([self.subject.pk], today=self.today)[self.subject.pk]
+        self.assertAlmostEqual(result['topics_per_week'], 1.0, delta=0.15)
+        # six topics left at about one a week: mid-November, past the end of October
+        self.assertGreater(result['projected_finish'], date(2026, 11, 5))
+        self.assertGreater(result['days_late'], 0)
+        self.assertEqual(result['projected_lectures'], 10)
+        self.assertIn('Graphics: at 1.', result['alert'])
+
+    def test_refresh_only_recomputes_stale_forecasts(self):
+        self.assertEqual(forecast.refresh(today=self.today), 1)
+        self.assertEqual(forecast.refresh(today=self.today), 0)
+        self.assertEqual(forecast.refresh(today=self.today + timedelta(days=1)), 1)
+        SubjectProgressRollup.touch(self.subject.pk)
+        self.assertEqual(forecast.refresh(today=self.today + timedelta(days=1)), 1)
+        self.assertEqual(forecast.refresh(force=True, today=self.today + timedelta(days=1)), 1)
+
+    def test_finished_and_unstarted_subjects(self):
+        for topic in self.topics[4:]:
+            TopicStatus.objects.create(topic=topic, completed=True)
+        result = forecast.compute([self.subject.pk], today=self.today)[self.subject.pk]
+        self.assertEqual((result['alert'], result['projected_lectures']), ('', 4))
+        TopicStatus.objects.all().delete()
+        result = forecast.compute([self.subject.pk], today=self.today)[self.subject.pk]
+        self.assertEqual(result['projected_finish'], None)
+        self.assertEqual(result['alert'], 'Graphics: no topics completed yet, 10 left before Oct 31.')
+
+    def test_pace_follows_snapshots_once_there_are_some(self):
+        # all four done in the first week, re-saved weekly since: updated_at alone says one a week
+        SubjectProgressSnapshot.objects.bulk_create([
+            SubjectProgressSnapshot(subject=self.subject, day=date(2026, 9, 8 + 7 * week), topics_completed=4)
+            for week in range(4)
+        ])
+        result = forecast.compute([self.subject.pk], today=self.today)[self.subject.pk]
+        self.assertLess(result['topics_per_week'], 0.8)
+
+    def test_dashboard_reads_stored_alerts(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('teacher_dashboard'))
+        stored = SubjectForecast.objects.get(subject=self.subject)
+        self.assertEqual(response.context['alerts'], [stored.alert])
+        with self.assertNumQueries(7):
+            self.client.get(reverse('teacher_dashboard'))
+
+
+class ProgressEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Networks', teacher=cls.teacher)
+        chapter = Chapter.objects.create(subject=cls.subject, title='Routing', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='BGP', order=1)
+        cls.students = [User.objects.create(username=f'stu{i}') for i in range(3)]
+        for student in cls.students:
+            Enrollment.objects.create(user=student, subject=cls.subject, role='student')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.url = reverse('toggle_topic', args=[self.topic.pk])
+
+    def _import(self, student, status):
+        imports.import_records(StringIO(f'student_id,topic_id,status\n{student.pk},{self.topic.pk},{status}\n'),
+                               'progress')
+
+    def test_toggles_and_imports_append_to_the_log(self):
+        self.client.post(self.url, {'completed': '1'})
+        self._import(self.students[0], 'in_progress')
+        toggle, imported = ProgressEvent.objects.order_by('pk')
+        self.assertEqual((toggle.student_id, toggle.status, toggle.source, toggle.actor, toggle.applied),
+                         (None, 'completed', 'toggle', self.teacher, True))
+        self.assertEqual((imported.student, imported.status, imported.source),
+                         (self.students[0], 'in_progress', 'import'))
+        self.assertEqual(TopicProgress.objects.filter(status='completed').count(), 2)
+
+    def test_deferred_fanout_lands_on_compaction(self):
+        with self.settings(PROGRESS_FANOUT='deferred'):
+            self.assertEqual(self.client.post(self.url, {'completed': '1'}).status_code, 200)
+        self.assertFalse(TopicProgress.objects.exists())
+        self.assertFalse(ProgressEvent.objects.get().applied)
+
+        result = events.compact(settle=0)
+        self.assertEqual((result['events'], result['rows_written'], result['subjects']), (1, 3, 1))
+        self.assertEqual(TopicProgress.objects.filter(status='completed').count(), 3)
+        self.assertEqual(SubjectProgressRollup.objects.get(subject=self.subject).completed_count, 3)
+        snapshot = SubjectProgressSnapshot.objects.get(subject=self.subject)
+        self.assertEqual((snapshot.topics_completed, snapshot.completed_count, snapshot.event_count), (1, 3, 1))
+        self.assertEqual(events.compact(settle=0)['events'], 0)
+
+    def test_later_applied_events_win_and_snapshots_accumulate(self):
+        with self.settings(PROGRESS_FANOUT='deferred'):
+            self.client.post(self.url, {'completed': '1'})
+        self._import(self.students[0], 'not_started')
+        # too fresh to compact yet
+        self.assertEqual(events.compact()['events'], 0)
+        events.compact(settle=0, batch_size=1)
+        statuses = dict(TopicProgress.objects.values_list('student__username', 'status'))
+        self.assertEqual(statuses, {'stu0': 'not_started', 'stu1': 'completed', 'stu2': 'completed'})
+        self.assertEqual(SubjectProgressSnapshot.objects.get(subject=self.subject).event_count, 2)
+
+    def test_command(self):
+        self.client.post(self.url, {'completed': '1'})
+        out = StringIO()
+        call_command('compact_progress', '--settle=0', stdout=out)
+        self.assertIn('Compacted 1 event(s): 0 progress row(s), 1 subject snapshot(s)', out.getvalue())
+
+
+class AttendanceAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Statistics', teacher=cls.teacher)
+        for i in range(10):
+            Enrollment.objects.create(user=User.objects.create(username=f'stu{i}'), subject=cls.subject)
+        # Mon/Wed of the weeks of Sep 7 and Sep 14, nothing the week after, one on Sep 28
+        for day, attendees in ((7, 8), (9, 6), (14, 5), (16, 5), (28, 9)):
+            LectureSession.objects.create(subject=cls.subject, date=date(2026, 9, day), attendees=attendees)
+        LectureSession.objects.create(subject=cls.subject, date=date(2026, 10, 5), attendees=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        self.url = reverse('attendance_analytics', args=[self.subject.pk])
+
+    def test_weekly_monthly_and_rolling(self):
+        data = self.client.get(self.url, {'format': 'json'}).json()
+        self.assertEqual((data['enrolled'], data['sessions'], data['attendees'], data['rate']), (10, 6, 43, 71.7))
+        self.assertEqual([(w['start'], w['sessions'], w['mean'], w['rate']) for w in data['weekly']], [
+            ('2026-09-07', 2, 7.0, 70.0), ('2026-09-14', 2, 5.0, 50.0),
+            ('2026-09-28', 1, 9.0, 90.0), ('2026-10-05', 1, 10.0, 100.0),
+        ])
+        # four calendar weeks: Oct 5 no longer reaches back to Sep 7
+        self.assertEqual([w['rolling_mean'] for w in data['weekly']], [7.0, 6.0, 6.6, 7.2])
+        self.assertEqual([(m['start'], m['sessions'], m['peak']) for m in data['monthly']],
+                         [('2026-09-01', 5, 9), ('2026-10-01', 1, 10)])
+
+    def test_cached_until_the_version_moves(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(self.url)
+        self.assertFalse([q for q in cached.captured_queries if 'myapp_lecturesession' in q['sql']])
+        LectureSession.objects.create(subject=self.subject, date=date(2026, 10, 6), attendees=0)
+        self.assertEqual(self.client.get(self.url, {'format': 'json'}).json()['sessions'], 7)
+
+    def test_chart_fragment(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, '<rect', count=4)
+        self.assertContains(response, '71.7% of 10 enrolled')
+        self.assertEqual(attendance.chart(attendance.summary(self.subject.pk, 10))['bars'][-1]['h'], 120)
+
+    def test_other_teachers_are_refused(self):
+        other = User.objects.create_user('other', is_staff=True)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher')
+        cls.teacher.groups.add(Group.objects.create(name='Teacher'))
+        cls.subject = Subject.objects.create(name='Robotics', teacher=cls.teacher)
+        chapter = Chapter.objects.create(subject=cls.subject, title='Kinematics', order=1)
+        cls.topic = Topic.objects.create(chapter=chapter, title='Jacobians', order=1)
+        cls.student = User.objects.create(username='stu')
+        Enrollment.objects.create(user=cls.student, subject=cls.subject, role='student')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.calls = []
+        patcher = mock.patch.dict(jobs.TASKS, {'flaky': (self._flaky, 3)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _flaky(self, fail_times=0):
+        self.calls.append(fail_times)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError('try again')
+        return {'calls': len(self.calls)}
+
+    def _run_due(self, at):
+        with mock.patch('django.utils.timezone.now', return_value=at):
+            return jobs.work(once=True)
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = jobs.enqueue('flaky', {'fail_times': 2})
+        start = timezone.now()
+        self.assertEqual(self._run_due(start), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('RuntimeError: try again', job.error)
+        self.assertEqual(job.run_after - start, timedelta(seconds=jobs.BACKOFF_SECONDS))
+        # not due yet, then the second backoff doubles
+        self.assertEqual(self._run_due(start + timedelta(seconds=1)), 0)
+        self._run_due(start + timedelta(seconds=jobs.BACKOFF_SECONDS))
+        job.refresh_from_db()
+        self.assertEqual(job.run_after - start, timedelta(seconds=jobs.BACKOFF_SECONDS * 3))
+        self._run_due(start + timedelta(minutes=1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result, job.error), ('succeeded', 3, {'calls': 3}, ''))
+
+    def test_fails_after_max_attempts_and_requeues_lost_jobs(self):
+        job = jobs.enqueue('flaky', {'fail_times': 5})
+        later = timezone.now() + timedelta(hours=1)
+        for _ in range(3):
+            self._run_due(later)
+            later += timedelta(hours=1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+        lost = jobs.enqueue('flaky')
+        self.assertEqual(jobs.claim('gone').pk, lost.pk)
+        self.assertEqual(jobs.requeue_lost(timezone.now() + timedelta(seconds=jobs.LEASE_SECONDS + 1)), 1)
+        self.assertEqual(self._run_due(timezone.now() + timedelta(seconds=jobs.LEASE_SECONDS + 1)), 1)
+        lost.refresh_from_db()
+        self.assertEqual((lost.status, lost.attempts), ('succeeded', 2))
+
+    def test_heartbeats_keep_long_jobs_running(self):
+        job = jobs.enqueue('flaky')
+        start = timezone.now()
+        with mock.patch('django.utils.timezone.now', return_value=start):
+            job = jobs.claim('slow')
+        # still beating well past the lease: not lost
+        late = start + timedelta(seconds=jobs.LEASE_SECONDS * 3)
+        with mock.patch('django.utils.timezone.now', return_value=late):
+            self.assertTrue(jobs.heartbeat(job))
+        self.assertEqual(jobs.requeue_lost(late + timedelta(seconds=jobs.HEARTBEAT_SECONDS)), 0)
+        # silent for a lease: requeued, and the original's beats and result no longer land
+        self.assertEqual(jobs.requeue_lost(late + timedelta(seconds=jobs.LEASE_SECONDS + 1)), 1)
+        self.assertFalse(jobs.heartbeat(job))
+        jobs.run(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('queued', None))
+
+    def test_run_beats_while_the_task_runs(self):
+        beat = threading.Event()
+        jobs.TASKS['flaky'] = (lambda: {'beat': beat.wait(5)}, 3)  # returns once the heartbeat thread beat
+        jobs.enqueue('flaky')
+        job = jobs.claim('w')
+        with mock.patch.object(jobs, 'HEARTBEAT_SECONDS', 0.01), \
+                mock.patch.object(jobs, 'heartbeat', side_effect=lambda job: beat.set() or True):
+            jobs.run(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'beat': True}))
+
+    def test_unique_and_unknown_tasks(self):
+        first = jobs.enqueue('flaky', unique=True)
+        self.assertEqual(jobs.enqueue('flaky', unique=True).pk, first.pk)
+        self.assertNotEqual(jobs.enqueue('flaky', {'fail_times': 1}, unique=True).pk, first.pk)
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('nope')
+
+    def test_report_job_polling_and_result(self):
+        response = self.client.post(reverse('subject_report', args=[self.subject.pk]))
+        self.assertEqual(response.status_code, 202)
+        status_url = response['Location']
+        self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+        self.assertContains(self.client.get(status_url, HTTP_HX_REQUEST='true'), 'hx-trigger="every 2s"')
+        jobs.work(once=True)
+        data = self.client.get(status_url).json()
+        self.assertEqual(data['status'], 'succeeded')
+        self.assertNotIn('hx-trigger', self.client.get(status_url, {'format': 'html'}).content.decode())
+        self.assertContains(self.client.get(data['result_url']), 'Jacobians')
+        # someone else's job is not found
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    def test_deferred_toggle_queues_one_compaction(self):
+        url = reverse('toggle_topic', args=[self.topic.pk])
+        with self.settings(PROGRESS_FANOUT='deferred'), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'completed': '1'})
+        with self.settings(PROGRESS_FANOUT='deferred'), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'completed': '0'})
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'compact_progress')
+        self._run_due(timezone.now() + timedelta(seconds=events.SETTLE_SECONDS + 1))
+        self.assertEqual(TopicProgress.objects.get(student=self.student).status, 'in_progress')
+
+    def test_seed_in_the_background(self):
+        out = StringIO()
+        call_command('seed_scale', '--background', '--subjects=1', '--chapters=1', '--topics=1',
+                     '--students=2', '--sessions=1', '--prefix=bg', stdout=out)
+        self.assertFalse(Subject.objects.filter(name__startswith='bg-').exists())
+        call_command('run_worker', '--once', '--threads=1', stdout=out)
+        self.assertIn('Ran 1 job(s)', out.getvalue())
+        self.assertEqual(Job.objects.get().status, 'succeeded')
+        self.assertTrue(Subject.objects.filter(name__startswith='bg-').exists())
+
+
+class SettingsProfileTests(SimpleTestCase):
+    def load(self, name, **env):
+        with mock.patch.dict(os.environ, {k: v for k, v in env.items() if v is not None}):
+            for key in [k for k, v in env.items() if v is None]:
+                os.environ.pop(key, None)
+            for module in [m for m in sys.modules if m.startswith('myproject.settings.')]:
+                del sys.modules[module]
+            try:
+                return importlib.import_module(f'myproject.settings.{name}')
+            finally:
+                for module in [m for m in sys.modules if m.startswith('myproject.settings.')]:
+                    del sys.modules[module]
+
+    def test_prod_is_debug_free_with_health_checked_connections(self):
+        prod = self.load('prod', SECRET_KEY='x' * 50, database_url='postgres://u:p@db/app', DB_CONN_MAX_AGE='300',
+                         CACHE_URL='redis://cache:6379/1')
+        self.assertFalse(prod.DEBUG)
+        self.assertFalse(set(prod.MIDDLEWARE) & set(prod.DEBUG_ONLY_MIDDLEWARE))
+        self.assertFalse(set(prod.INSTALLED_APPS) & set(prod.DEBUG_ONLY_APPS))
+        db = prod.DATABASES['default']
+        self.assertEqual((db['CONN_MAX_AGE'], db['CONN_HEALTH_CHECKS']), (300, True))
+        self.assertEqual(db['OPTIONS'], {'sslmode': 'require'})
+        self.assertIn('django.template.loaders.cached.Loader', str(prod.TEMPLATES[0]['OPTIONS']['loaders']))
+        self.assertEqual(prod.CACHES['default'], {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                  'LOCATION': 'redis://cache:6379/1'})
+
+    def test_prod_requires_a_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load('prod', SECRET_KEY=None)
+
+    def test_prod_sqlite_only_when_asked_for(self):
+        env = {'SECRET_KEY': 'x' * 50, 'database_url': None, 'CACHE_URL': 'memcached://cache:11211'}
+        with self.assertRaisesMessage(ImproperlyConfigured, 'database_url'):
+            self.load('prod', SQLITE_PATH=None, **env)
+        prod = self.load('prod', SQLITE_PATH='/tmp/bench.db', **env)
+        self.assertEqual(prod.DATABASES['default'], {'ENGINE': 'django.db.backends.sqlite3', 'NAME': '/tmp/bench.db'})
+        self.assertEqual(prod.CACHES['default']['LOCATION'], 'cache:11211')
+
+    def test_prod_requires_a_shared_cache(self):
+        for url in (None, 'locmem://', 'file:///tmp/cache'):
+            with self.subTest(url=url), self.assertRaisesMessage(ImproperlyConfigured, 'CACHE_URL'):
+                self.load('prod', SECRET_KEY='x' * 50, database_url='postgres://u:p@db/app', CACHE_URL=url)
+
+
+class ViewBenchmarkTests(TestCase):
+    """Runs myapp.benchmarks over every route; size and output via BENCH_* env vars."""
+
+    def test_every_route_has_a_scenario_and_budget(self):
+        names = benchmarks.route_names()
+        self.assertEqual(names - set(benchmarks.SCENARIOS), set())
+        self.assertEqual(names - set(benchmarks.QUERY_BUDGETS), set())
+
+    def test_views_within_budget(self):
+        results = benchmarks.run()
+        benchmarks.write_results(results)
+        self.assertEqual(benchmarks.check_budgets(results), [])
+
+    def test_unexpected_status_fails(self):
+        ok = {'queries': 1, 'p95_ms': 1.0}
+        results = {'views': {'home': {**ok, 'status': 302}, 'signup': {**ok, 'status': 403},
+                             'delete_chapter': {**ok, 'status': 200}}}
+        self.assertEqual(benchmarks.check_budgets(results), [
+            'signup: HTTP 403, expected 200', 'delete_chapter: HTTP 200, expected 204',
+        ])
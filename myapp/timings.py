@@ -0,0 +1,147 @@
+"""Per-request query count, DB time, template time and total time, plus a rolling
+in-memory histogram of them per URL name.
+
+RequestTimingMiddleware (myapp/middleware.py) opens a RequestTiming per request in a
+context variable. The database and template hooks installed below add to whichever
+one is current, so they see sync views, async views and the threads sync_to_async
+runs code in (asgiref copies the context into them). Template time is the time spent
+in top-level renders, including any queries the templates run. For streaming
+responses everything is measured up to the first byte only.
+
+The histogram lives in the worker process: with several workers each keeps its own.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+WINDOW = 500  # most recent requests kept per URL name
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+UNRESOLVED = '(unresolved)'
+
+_current = ContextVar('request_timing', default=None)
+_samples = {}  # URL name -> deque of (total_ms, db_ms, template_ms, queries)
+_lock = threading.Lock()
+
+
+class RequestTiming:
+    __slots__ = ('started', 'total', 'db', 'template', 'queries', 'rendering')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = self.db = self.template = 0.0
+        self.queries = 0
+        self.rendering = False
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2), 'db_ms': round(self.db * 1000, 2),
+            'template_ms': round(self.template * 1000, 2), 'queries': self.queries,
+        }
+
+    def server_timing(self):
+        """The ``Server-Timing`` header value."""
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'tpl;dur={self.template * 1000:.1f}, total;dur={self.total * 1000:.1f}')
+
+
+def start():
+    """Open a RequestTiming for the current context; returns it and the token for stop()."""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db += time.perf_counter() - started
+        timing.queries += 1
+
+
+def _hook_connection(connection, **kwargs):
+    # connections are per thread and reconnect in place, so this runs more than once per wrapper
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+_render = Template.render
+
+
+def _timed_render(self, context=None, request=None):
+    timing = _current.get()
+    if timing is None or timing.rendering:
+        return _render(self, context, request)
+    timing.rendering = True
+    started = time.perf_counter()
+    try:
+        return _render(self, context, request)
+    finally:
+        timing.template += time.perf_counter() - started
+        timing.rendering = False
+
+
+def install():
+    """Hook query and template timing in; safe to call more than once."""
+    connection_created.connect(_hook_connection, dispatch_uid='myapp.timings')
+    for connection in connections.all(initialized_only=True):
+        _hook_connection(connection)
+    Template.render = _timed_render
+
+
+def record(name, timing):
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=WINDOW)
+        samples.append((timing.total * 1000, timing.db * 1000, timing.template * 1000, timing.queries))
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def snapshot():
+    """One summary dict per URL name seen, sorted by name, over its last WINDOW requests."""
+    with _lock:
+        data = {name: list(samples) for name, samples in _samples.items()}
+    rows = []
+    for name, samples in sorted(data.items()):
+        totals = sorted(s[0] for s in samples)
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        for total in totals:
+            buckets[next((i for i, bound in enumerate(BUCKETS_MS) if total <= bound), len(BUCKETS_MS))] += 1
+        n = len(samples)
+        rows.append({
+            'name': name,
+            'count': n,
+            'total_p50_ms': round(_percentile(totals, 50), 2),
+            'total_p95_ms': round(_percentile(totals, 95), 2),
+            'total_max_ms': round(totals[-1], 2),
+            'db_mean_ms': round(sum(s[1] for s in samples) / n, 2),
+            'template_mean_ms': round(sum(s[2] for s in samples) / n, 2),
+            'queries_mean': round(sum(s[3] for s in samples) / n, 1),
+            'queries_max': max(s[3] for s in samples),
+            'buckets': buckets,
+        })
+    return rows
@@ -20,6 +20,8 @@ urlpatterns = [
     # subject detail + partials
     path('subject/<int:pk>/', views.subject_detail, name='subject_detail'),
     path('subject/<int:pk>/progress/', views.progress_partial, name='progress_partial'),  # HTMX poll
+    path('progress/stream/', views.progress_stream, name='progress_stream'),  # SSE push
+    path('progress/batch/', views.progress_batch, name='progress_batch'),  # all dashboard subjects at once
     
     # chapter management
     path('subject/<int:pk>/chapter/add/', views.add_chapter, name='add_chapter'),
@@ -35,7 +37,19 @@ urlpatterns = [
 
     # attendance
     path('subject/<int:pk>/session/add/', views.add_session, name='add_session'),
+    path('subject/<int:pk>/attendance/', views.attendance_analytics, name='attendance_analytics'),  # HTMX / JSON
+
+    # bulk import (progress + attendance)
+    path('import/', views.import_records, name='import_records'),
 
     # printable reports
     path('report/subject/<int:pk>/', views.subject_report, name='subject_report'),
+    path('report/subject/<int:pk>/progress/', views.export_progress, name='export_progress'),  # CSV / JSON lines
+
+    # background jobs (status polling + results)
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/result/', views.job_result, name='job_result'),
+
+    # staff-only request timings
+    path('stats/requests/', views.request_stats, name='request_stats'),
 ]
@@ -1,20 +1,94 @@
+import asyncio
+import io
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login as auth_login
 from django.contrib import messages
-from django.contrib.auth.models import Group, User
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_protect
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, HttpResponseBadRequest
-from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.safestring import mark_safe
 from django.db.models import Count
-from .models import Subject, Chapter, Topic, TopicStatus, LectureSession, Enrollment, TopicProgress
+from .models import Subject, Chapter, Topic, LectureSession, Enrollment, TopicProgress, SubjectProgressRollup, SubjectForecast, Profile, Job
+from . import attendance, forecast, fragments, jobs, pagination, partials, roles, tasks, timings
+from .exports import EXPORT_FORMATS, iter_export
+from .imports import IMPORT_FORMATS, IMPORT_KINDS, guess_format, import_records as run_import
 from .forms import SignupForm, ProfileForm, ProfileExtendedForm
+from .progress import TopicStatusConflict, propagate_topic_status
+from .pubsub import get_broker, subject_channel
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def _subject_validators(request, pk):
+    """(etag, last_modified) for a subject page, read once per request from its rollup row.
+
+    The rollup's version moves on every progress, topic, chapter, status and session
+    change, so an unchanged version means the page would render byte-identically.
+    The user id is part of the ETag because the markup is role/student specific.
+    Requests with flash messages waiting get no validators: a 304 would leave them
+    queued, to show up on some later page.
+    """
+    if not hasattr(request, '_subject_validators'):
+        if _pending_messages(request):
+            request._subject_validators = (None, None)
+        else:
+            row = _validator_rows(pk).first()
+            request._subject_validators = _validators_from_row(pk, row, request.user)
+    return request._subject_validators
+
+async def _asubject_validators(request, pk):
+    """_subject_validators() for async views; condition() calls its functions synchronously."""
+    if not hasattr(request, '_subject_validators'):
+        user = await request.auser()
+        # auser() has loaded the session, so the message storage reads it without a query
+        if _pending_messages(request):
+            request._subject_validators = (None, None)
+        else:
+            row = await _validator_rows(pk).afirst()
+            request._subject_validators = _validators_from_row(pk, row, user)
+    return request._subject_validators
+
+def _pending_messages(request):
+    # len() loads the queued messages without marking them used
+    return len(messages.get_messages(request)) > 0
+
+def _validator_rows(pk):
+    return SubjectProgressRollup.objects.filter(subject_id=pk).values_list('version', 'updated_at')
+
+def _validators_from_row(pk, row, user):
+    if row is None:
+        return (None, None)
+    version, updated_at = row
+    return (f'{pk}-{version}-{user.pk}', updated_at)
+
+def subject_conditional(view):
+    """Answer unchanged subject pages with 304 before the view runs any query."""
+    conditional = condition(
+        etag_func=lambda request, pk: _subject_validators(request, pk)[0],
+        last_modified_func=lambda request, pk: _subject_validators(request, pk)[1],
+    )(view)
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def prefetched(request, pk, *args, **kwargs):
+            await _asubject_validators(request, pk)
+            return await conditional(request, pk, *args, **kwargs)
+        return cache_control(private=True, no_cache=True)(prefetched)
+    return cache_control(private=True, no_cache=True)(conditional)
 
 def _is_teacher(user):
-    return user.is_staff or user.groups.filter(name__iexact='Teacher').exists()
+    return roles.is_teacher(user)
 
 def _is_student(user):
-    return user.groups.filter(name__iexact='Student').exists()
+    return roles.is_student(user)
 
 
 def login_role(request, role=None):
@@ -84,159 +158,334 @@ def teacher_profile_view(request, pk):
         return HttpResponseBadRequest('Not a teacher')
     return render(request, 'myapp/teacher_profile.html', {'teacher': teacher})
 
+def _dashboard_subjects(user):
+    if _is_teacher(user):
+        return Subject.objects.filter(teacher=user).order_by('class_name','name')
+    return Subject.objects.filter(enrollment__user=user, enrollment__role='student').order_by('name')
+
+async def _async_user(request, with_profile=True):
+    """The user for an async view, with its roles and (for full pages) profile loaded.
+
+    Also installed as ``request.user``: the lazy one would look the user up again
+    synchronously, and templates (topbar.html reads ``user.profile``) can't query
+    inside the event loop.
+    """
+    user = request.user = await request.auser()
+    await roles.aget_roles(user)
+    if with_profile and user.is_authenticated:
+        # cache the reverse one-to-one, None included, so the template never queries
+        User.profile.related.set_cached_value(user, await Profile.objects.filter(user=user).afirst())
+    return user
+
+async def _adashboard_page(user, cursor):
+    """One keyset page of the user's dashboard subjects, fetched with the async ORM.
+
+    Only the card columns are loaded. Each subject carries its rendered progress bar,
+    so a card shows real numbers without waiting for the SSE stream or a poll.
+    Returns the page and the cursor of the next one (None on the last page).
+    """
+    size = pagination.PAGE_SIZE
+    subjects = (pagination.after(_dashboard_subjects(user), cursor)
+                .only(*pagination.CARD_FIELDS, 'rollup').select_related('rollup')
+                .with_stats()[:size + 1])
+    rows = [s async for s in subjects]
+    if any(s.annotated_progress is None for s in rows):
+        # progress_percent would build the missing rollup rows synchronously
+        await sync_to_async(SubjectProgressRollup.rebuild)([s.pk for s in rows if s.annotated_progress is None])
+        rows = [s async for s in subjects.all()]
+    page, next_cursor = pagination.split_page(rows, size)
+    contexts = await _aprogress_contexts(user, page)
+    for s in page:
+        s.progress_bar = partials.progress_bar(contexts[s.pk])
+    return page, next_cursor
+
+async def _dashboard(request, template, cards_template, alerts=None):
+    """Full dashboard page, or with ``?cursor=`` just the next page of cards (HTMX ``revealed``)."""
+    cursor = request.GET.get('cursor')
+    user = await _async_user(request, with_profile=cursor is None)
+    try:
+        subjects, next_cursor = await _adashboard_page(user, cursor)
+    except pagination.InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    context = {'subjects': subjects, 'next_cursor': next_cursor}
+    if cursor is not None:
+        return render(request, cards_template, context)
+    if alerts is not None:
+        context['alerts'] = await alerts(user)
+    context['sse'] = settings.PROGRESS_SSE
+    return render(request, template, context)
+
+async def _teacher_alerts(user):
+    # stored pace forecasts (myapp/forecast.py); only stale ones are recomputed here
+    subjects = _dashboard_subjects(user)
+    await sync_to_async(forecast.refresh)(subjects)
+    alerts = (SubjectForecast.objects.filter(subject__in=subjects).exclude(alert='')
+              .order_by('subject__class_name', 'subject__name').values_list('alert', flat=True))
+    return [alert async for alert in alerts]
+
 @login_required
 def home(request):
     return redirect('teacher_dashboard' if _is_teacher(request.user) else 'student_dashboard')
 
 @login_required
 @user_passes_test(lambda u: _is_teacher(u))
-def teacher_dashboard(request):
-    subjects = Subject.objects.filter(teacher=request.user).order_by('class_name','name')  # only teacher's subjects
-    alerts = []
-    today = timezone.now().date()
-    for s in subjects:
-        # simple weeks-left heuristic
-        weeks_left = max(((s.end_date - today).days // 7) if s.end_date else 12, 1)
-        left_pct = 100 - s.progress_percent
-        if left_pct > weeks_left * 5:  # arbitrary nudge: >5% per remaining week
-            alerts.append(f"{s.name}: {left_pct:.0f}% syllabus left but only ~{weeks_left} weeks remain.")
-    return render(request, 'myapp/teacher_dashboard.html', {'subjects': subjects, 'alerts': alerts})
+async def teacher_dashboard(request):
+    return await _dashboard(request, 'myapp/teacher_dashboard.html', 'myapp/_teacher_cards.html', _teacher_alerts)
 
 @login_required
-def student_dashboard(request):
-    subs = Subject.objects.all().order_by('name')
-    # If you wire enrollments, filter: subs = Subject.objects.filter(enrollment__user=request.user, enrollment__role='student')
-    return render(request, 'myapp/student_dashboard.html', {'subjects': subs})
+async def student_dashboard(request):
+    return await _dashboard(request, 'myapp/student_dashboard.html', 'myapp/_student_cards.html')
 
 @login_required
-def subject_detail(request, pk):
-    subject = get_object_or_404(Subject, pk=pk)
-    if _is_teacher(request.user) and subject.teacher != request.user:
+@subject_conditional
+async def subject_detail(request, pk):
+    user = await _async_user(request)
+    # the rollup row carries the chapter tree's cache version
+    subject = await aget_object_or_404(Subject.objects.select_related('rollup'), pk=pk)
+    is_teacher = _is_teacher(user)
+    if is_teacher and subject.teacher_id != user.pk:
         messages.error(request, "You don't have permission to view this subject.")
         return redirect('teacher_dashboard')
-    chapters = (Chapter.objects.filter(subject=subject)
-                .prefetch_related('topics__status'))
-    sessions = subject.sessions.all()[:10]
+    sessions = [s async for s in subject.sessions.all()[:10]]
+    chapter_tree = await sync_to_async(fragments.chapter_tree)(subject, is_teacher)
     return render(request, 'myapp/subject_detail.html', {
-        'subject': subject, 'chapters': chapters, 'sessions': sessions, 'is_teacher': _is_teacher(request.user)
+        'subject': subject, 'chapter_tree': chapter_tree,
+        'sessions': sessions, 'is_teacher': is_teacher,
     })
 
-@login_required
-def progress_partial(request, pk):
-    """HTMX-polled progress bar."""
-    subject = get_object_or_404(Subject, pk=pk)
-    if _is_student(request.user):
-        # Calculate individual student progress
-        total_topics = Topic.objects.filter(chapter__subject=subject).count()
-        if total_topics == 0:
-            progress_percent = 0
-            completed = in_progress = remaining = 0
-        else:
-            topic_progress = TopicProgress.objects.filter(
-                student=request.user,
-                topic__chapter__subject=subject
-            ).values('status').annotate(count=Count('status'))
-            
-            progress_counts = {
-                'completed': 0,
-                'in_progress': 0,
-                'not_started': 0
-            }
-            for p in topic_progress:
-                progress_counts[p['status']] = p['count']
-                
-            completed = progress_counts['completed']
-            in_progress = progress_counts['in_progress']
-            remaining = progress_counts['not_started']
-            
-            # Ensure the total of all statuses equals total_topics
-            if (completed + in_progress + remaining) < total_topics:
-                remaining = total_topics - (completed + in_progress)
-                
-            progress_percent = (completed + (in_progress * 0.5)) / total_topics * 100 if total_topics > 0 else 0
-    else:
-        # For teachers, show overall class progress
-        total_topics = Topic.objects.filter(chapter__subject=subject).count()
-        all_progress = TopicProgress.objects.filter(
-            topic__chapter__subject=subject
-        ).values('status').annotate(count=Count('status'))
-        
-        progress_counts = {
-            'completed': 0,
-            'in_progress': 0,
-            'not_started': 0
-        }
-        for p in all_progress:
-            progress_counts[p['status']] = p['count']
-            
-        student_count = User.objects.filter(groups__name='Student').count()
-        if student_count > 0:
-            completed = progress_counts['completed'] / student_count
-            in_progress = progress_counts['in_progress'] / student_count
-            remaining = progress_counts['not_started'] / student_count
-            progress_percent = (completed + (in_progress * 0.5)) / total_topics * 100
+def _progress_contexts(user, subjects):
+    """Template contexts for _progress_bar.html keyed by subject id.
+
+    Students get their own numbers, everyone else the class average. Runs a fixed
+    number of queries however many subjects are passed: one for the rollup rows (none
+    if the subjects were loaded with select_related('rollup')) and, for students, one
+    GROUP BY subject, status over their progress rows.
+    """
+    rollups = _joined_rollups(subjects)
+    if len(rollups) < len(subjects):
+        rollups.update((r.subject_id, r) for r in SubjectProgressRollup.objects.filter(
+            subject__in=[s for s in subjects if s.pk not in rollups]))
+    missing = [s.pk for s in subjects if s.pk not in rollups]
+    if missing:
+        SubjectProgressRollup.rebuild(missing)
+        rollups.update((r.subject_id, r) for r in SubjectProgressRollup.objects.filter(subject_id__in=missing))
+
+    student_counts = None
+    if _is_student(user):
+        student_counts = _empty_counts(subjects)
+        for p in _student_count_rows(user, subjects):
+            student_counts[p['subject']][p['status']] = p['count']
+    return _build_progress_contexts(subjects, rollups, student_counts)
+
+async def _aprogress_contexts(user, subjects):
+    """_progress_contexts() with the async ORM; same queries."""
+    rollups = _joined_rollups(subjects)
+    if len(rollups) < len(subjects):
+        rollups.update([(r.subject_id, r) async for r in SubjectProgressRollup.objects.filter(
+            subject__in=[s for s in subjects if s.pk not in rollups])])
+    missing = [s.pk for s in subjects if s.pk not in rollups]
+    if missing:
+        await sync_to_async(SubjectProgressRollup.rebuild)(missing)
+        rollups.update([(r.subject_id, r) async for r in SubjectProgressRollup.objects.filter(subject_id__in=missing)])
+
+    student_counts = None
+    if roles.is_student(user):
+        student_counts = _empty_counts(subjects)
+        async for p in _student_count_rows(user, subjects):
+            student_counts[p['subject']][p['status']] = p['count']
+    return _build_progress_contexts(subjects, rollups, student_counts)
+
+def _joined_rollups(subjects):
+    # rows already loaded with select_related('rollup') need no query
+    related = Subject.rollup.related
+    return {s.pk: r for s in subjects if (r := related.get_cached_value(s, None)) is not None}
+
+def _empty_counts(subjects):
+    return {s.pk: {'completed': 0, 'in_progress': 0, 'not_started': 0} for s in subjects}
+
+def _student_count_rows(user, subjects):
+    return (TopicProgress.objects.filter(student=user, subject__in=subjects)
+            .order_by().values('subject', 'status').annotate(count=Count('id')))
+
+def _build_progress_contexts(subjects, rollups, student_counts):
+    contexts = {}
+    for subject in subjects:
+        rollup = rollups[subject.pk]
+        if student_counts is not None:
+            # Calculate individual student progress
+            total_topics = rollup.topic_count
+            if total_topics == 0:
+                progress_percent = 0
+                completed = in_progress = remaining = 0
+            else:
+                progress_counts = student_counts[subject.pk]
+                completed = progress_counts['completed']
+                in_progress = progress_counts['in_progress']
+                remaining = progress_counts['not_started']
+
+                # Ensure the total of all statuses equals total_topics
+                if (completed + in_progress + remaining) < total_topics:
+                    remaining = total_topics - (completed + in_progress)
+
+                progress_percent = (completed + (in_progress * 0.5)) / total_topics * 100
+        elif rollup.student_count > 0:
+            # For teachers, show overall class progress from the subject's rollup row
+            completed = rollup.completed_count / rollup.student_count
+            in_progress = rollup.in_progress_count / rollup.student_count
+            remaining = rollup.not_started_count / rollup.student_count
+            progress_percent = rollup.progress_percent
         else:
             completed = in_progress = remaining = progress_percent = 0
-            
-    context = {
-        'progress_percent': round(progress_percent, 1),
-        'completed_topics': round(completed),
-        'in_progress_topics': round(in_progress),
-        'remaining_topics': round(remaining),
-        'subject': subject
-    }
-    
-    return render(request, 'myapp/_progress_bar.html', context)
+
+        contexts[subject.pk] = {
+            'progress_percent': round(progress_percent, 1),
+            'completed_topics': round(completed),
+            'in_progress_topics': round(in_progress),
+            'remaining_topics': round(remaining),
+            'subject': subject
+        }
+    return contexts
+
+def _progress_context(user, subject):
+    return _progress_contexts(user, [subject])[subject.pk]
+
+@login_required
+@subject_conditional
+async def progress_partial(request, pk):
+    """HTMX-polled progress bar; async so that under ASGI a poll doesn't hold a thread."""
+    user = await _async_user(request, with_profile=False)
+    subject = await aget_object_or_404(Subject, pk=pk)
+    contexts = await _aprogress_contexts(user, [subject])
+    return HttpResponse(partials.progress_bar(contexts[subject.pk]))
+
+def _sse_event(event, data):
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines())
+    return f'event: {event}\n{lines}\n'
+
+@login_required
+def progress_batch(request):
+    """Progress for every subject on a dashboard in one request.
+
+    ``?s=<id>&s=<id>`` picks subjects (defaults to the user's dashboard subjects).
+    Returns HTMX out-of-band swaps targeting ``#progress-<id>``, or JSON with ``?format=json``.
+    """
+    subjects = _dashboard_subjects(request.user)
+    if request.GET.getlist('s'):
+        try:
+            subjects = subjects.filter(pk__in=[int(pk) for pk in request.GET.getlist('s')])
+        except ValueError:
+            return HttpResponseBadRequest("Invalid subject id")
+    contexts = _progress_contexts(request.user, list(subjects))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'subjects': {
+            pk: {k: v for k, v in ctx.items() if k != 'subject'} for pk, ctx in contexts.items()
+        }})
+    fragments = [
+        f'<div id="progress-{pk}" hx-swap-oob="innerHTML">'
+        f'{partials.progress_bar(ctx)}</div>'
+        for pk, ctx in contexts.items()
+    ]
+    return HttpResponse(''.join(fragments))
+
+@login_required
+async def progress_stream(request):
+    """Server-Sent Events stream of progress fragments for the dashboard subjects in ``?s=<id>&s=<id>``.
+
+    One connection per page; each subject is sent as a ``progress-<id>`` event, first on
+    connect and afterwards only when a change notification produces different HTML.
+    Needs the ASGI app (myproject/asgi.py): under WSGI the whole stream would have to be
+    read before anything is sent, so it is refused there and the dashboards poll
+    progress_batch unless PROGRESS_SSE is on.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponseBadRequest("Progress stream needs the ASGI app")
+    user = await request.auser()
+    await roles.aget_roles(user)
+    try:
+        subject_ids = [int(pk) for pk in request.GET.getlist('s')]
+    except ValueError:
+        return HttpResponseBadRequest("Invalid subject id")
+    # like progress_batch, only subjects on the user's own dashboard
+    subjects = [pk async for pk in _dashboard_subjects(user).filter(pk__in=subject_ids).values_list('pk', flat=True)]
+    if not subjects:
+        return HttpResponseBadRequest("No subjects")
+
+    @sync_to_async
+    def render_fragment(pk):
+        # reload each time: the instance caches its rollup row
+        subject = Subject.objects.select_related('rollup').get(pk=pk)
+        return partials.progress_bar(_progress_context(user, subject))
+
+    async def events():
+        sent = {}
+        pending = set(subjects)
+        async with get_broker().subscribe(*(subject_channel(pk) for pk in subjects)) as queue:
+            while True:
+                for pk in pending:
+                    html = await render_fragment(pk)
+                    if sent.get(pk) != html:
+                        sent[pk] = html
+                        yield _sse_event(f'progress-{pk}', html)
+                try:
+                    channel, _ = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    pending = set()
+                    yield ': keepalive\n\n'
+                    continue
+                # coalesce a burst of notifications into one render per subject
+                channels = {channel}
+                while not queue.empty():
+                    channels.add(queue.get_nowait()[0])
+                pending = {pk for pk in subjects if subject_channel(pk) in channels}
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 @login_required
 @csrf_protect
 def toggle_topic(request, topic_id):
+    """Set a topic's class-level status from its row's form.
+
+    The form posts the target state (``completed``) and the status ``version`` it was
+    rendered from; the write only applies while that version is current. So a double
+    submit, or two teachers clicking at once, can't flip it back: the loser gets 409
+    with the current row. Without a version a posted state is set as-is, and a bare
+    POST flips the status read here, guarded by its version.
+    """
     if request.method != 'POST':
         return HttpResponseBadRequest("POST only")
     
-    topic = get_object_or_404(Topic, pk=topic_id)
+    topic = get_object_or_404(Topic.objects.select_related('chapter', 'status'), pk=topic_id)
     
     # Only teachers can toggle topic status
     if not _is_teacher(request.user):
         return HttpResponseBadRequest("Only teachers can mark topics as completed")
     
-    # Toggle the topic status (for the whole class)
-    st, _ = TopicStatus.objects.get_or_create(topic=topic)
-    st.completed = not st.completed
-    st.updated_by = request.user
-    st.save()
-    
-    # Update all student progress entries
-    student_group = Group.objects.get(name='Student')
-    students = User.objects.filter(groups=student_group)
-    
-    for student in students:
-        # Update or create progress entry for each student
-        progress, created = TopicProgress.objects.get_or_create(
-            student=student,
-            topic=topic,
-            defaults={'status': 'not_started'}
-        )
-        # Update the status based on topic completion
-        progress.status = 'completed' if st.completed else 'in_progress'
-        progress.save()
-    st.save()
-    
-    # Update progress for all students
-    student_group = Group.objects.get(name='Student')
-    students = User.objects.filter(groups=student_group)
-    new_status = 'completed' if st.completed else 'in_progress'
-    
-    # Bulk update or create progress entries for all students
-    for student in students:
-        TopicProgress.objects.update_or_create(
-            student=student,
-            topic=topic,
-            defaults={'status': new_status}
-        )
+    try:
+        version = int(request.POST['version']) if request.POST.get('version') else None
+    except ValueError:
+        return HttpResponseBadRequest("Invalid version")
+    if 'completed' in request.POST:
+        completed = request.POST['completed'].lower() in ('1', 'true', 'on')
+    else:
+        status = getattr(topic, 'status', None)
+        completed = not (status and status.completed)
+        if version is None:
+            version = status.version if status else 0
+
+    # Apply it to the whole class and fan it out to every student
+    try:
+        propagate_topic_status(topic, completed, updated_by=request.user, expected_version=version)
+        code = 200
+    except TopicStatusConflict:
+        code = 409
+    topic = Topic.objects.select_related('status__updated_by').get(pk=topic.pk)
     
-    # Return the updated row + allow outer page to poll progress bar separately
-    return render(request, 'myapp/_topic_row.html', {'t': topic, 'is_teacher': _is_teacher(request.user)})
+    # Return the updated (or, on conflict, current) row + allow outer page to poll progress bar separately
+    return HttpResponse(partials.topic_row(topic, _is_teacher(request.user)), status=code)
 
 @login_required
 @user_passes_test(lambda u: _is_teacher(u))
@@ -254,9 +503,109 @@ def add_session(request, pk):
     return HttpResponseBadRequest("POST only")
 
 @login_required
+@subject_conditional
 def subject_report(request, pk):
-    """Printable HTML that users can save as PDF via browser."""
-    
+    """Printable HTML that users can save as PDF via browser; POST renders it as a background job."""
+    subject = get_object_or_404(Subject, pk=pk)
+    if request.method == 'POST':
+        job = jobs.enqueue('render_subject_report', {'subject_id': subject.pk}, user=request.user)
+        return _job_response(request, job, status=202)
+    return render(request, 'report_subject.html', tasks.report_context(subject))
+
+def _user_job(request, pk):
+    queryset = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+    return get_object_or_404(queryset, pk=pk)
+
+def _job_json(job):
+    data = {
+        'id': job.pk, 'task': job.task, 'status': job.status, 'attempts': job.attempts,
+        'max_attempts': job.max_attempts, 'error': job.error, 'status_url': reverse('job_status', args=[job.pk]),
+    }
+    if job.status == 'succeeded':
+        if job.task == 'render_subject_report':
+            data['result_url'] = reverse('job_result', args=[job.pk])
+        else:
+            data['result'] = job.result
+    return data
+
+def _job_response(request, job, status=200):
+    if request.headers.get('HX-Request') or request.GET.get('format') == 'html':
+        return render(request, 'myapp/_job_status.html', {'job': job}, status=status)
+    response = JsonResponse(_job_json(job), status=status)
+    if status == 202:
+        response['Location'] = reverse('job_status', args=[job.pk])
+    return response
+
+@login_required
+def job_status(request, pk):
+    """Poll a job: JSON, or an HTMX fragment that keeps polling itself until the job is done."""
+    return _job_response(request, _user_job(request, pk))
+
+@login_required
+def job_result(request, pk):
+    """The report a render_subject_report job produced, in the page it would have had."""
+    job = _user_job(request, pk)
+    if job.task != 'render_subject_report' or job.status != 'succeeded':
+        return HttpResponseBadRequest("This job has no report (yet)")
+    subject = get_object_or_404(Subject, pk=job.result['subject_id'])
+    return render(request, 'report_subject.html', {'subject': subject, 'body': mark_safe(job.result['html'])})
+
+@login_required
+@subject_conditional
+def attendance_analytics(request, pk):
+    """Weekly/monthly attendance of a subject as an HTMX chart fragment, or ``?format=json``."""
+    subject = get_object_or_404(Subject.objects.select_related('rollup'), pk=pk)
+    if _is_teacher(request.user) and subject.teacher_id != request.user.pk:
+        return HttpResponseForbidden("You don't have permission to view this subject.")
+    data = attendance.cached_summary(SubjectProgressRollup.for_subject(subject))
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    return render(request, 'myapp/_attendance_chart.html', {
+        'subject': subject, 'attendance': data, 'chart': attendance.chart(data),
+    })
+
+@login_required
+@user_passes_test(lambda u: _is_teacher(u))
+@gzip_page
+def export_progress(request, pk):
+    """Stream the student x topic progress matrix as ``?format=csv`` (default) or ``jsonl``.
+
+    Rows are pivoted while streaming, so memory stays flat however large the class;
+    gzip_page compresses the stream for clients that accept it.
+    """
+    subject = get_object_or_404(Subject, pk=pk)
+    if subject.teacher != request.user:
+        messages.error(request, "You don't have permission to export this subject.")
+        return redirect('teacher_dashboard')
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(iter_export(subject, fmt), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="progress-{subject.pk}.{fmt}"'
+    return response
+
+@login_required
+@user_passes_test(lambda u: _is_teacher(u))
+def import_records(request):
+    """Upload a CSV / JSON-lines file of progress or session records; answers with the import report.
+
+    Staff may import into any subject, teachers only into the subjects they teach.
+    """
+    if request.method != 'POST':
+        return render(request, 'myapp/import_records.html')
+    upload = request.FILES.get('file')
+    kind = request.POST.get('kind')
+    if upload is None or kind not in IMPORT_KINDS:
+        return HttpResponseBadRequest("A file and a kind of progress or sessions are required")
+    fmt = request.POST.get('format') or guess_format(upload.name)
+    if fmt not in IMPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown import format")
+    subjects = Subject.objects.all() if request.user.is_staff else Subject.objects.filter(teacher=request.user)
+    stream = io.TextIOWrapper(upload.open('rb'), encoding='utf-8-sig', newline='')
+    report = run_import(stream, kind, fmt, subjects)
+    return JsonResponse(report.as_dict(), json_dumps_params={'indent': 2})
+
 @login_required
 @user_passes_test(lambda u: _is_teacher(u))
 def add_chapter(request, pk):
@@ -280,7 +629,7 @@ def add_chapter(request, pk):
 @user_passes_test(lambda u: _is_teacher(u))
 def edit_chapter(request, pk):
     """Edit an existing chapter."""
-    chapter = get_object_or_404(Chapter, pk=pk)
+    chapter = get_object_or_404(fragments.with_topics(Chapter.objects.all()), pk=pk)
     
     if request.method == 'POST':
         title = request.POST.get('title')
@@ -313,10 +662,19 @@ def add_topic(request, pk):
         if title:
             order = Topic.objects.filter(chapter=chapter).count() + 1
             topic = Topic.objects.create(chapter=chapter, title=title, order=order)
-            return render(request, 'myapp/_topic_row.html', {'t': topic, 'is_teacher': True})
+            return HttpResponse(partials.topic_row(topic, True))
         return HttpResponseBadRequest("Title is required")
         
     return render(request, 'myapp/_topic_form.html', {'chapter': chapter})
-    subject = get_object_or_404(Subject, pk=pk)
-    chapters = Chapter.objects.filter(subject=subject).prefetch_related('topics__status')
-    return render(request, 'myapp/report_subject.html', {'subject': subject, 'chapters': chapters})
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def request_stats(request):
+    """Per-view timing histogram of this worker process (myapp/timings.py); ``?format=json`` for JSON."""
+    views = timings.snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'window': timings.WINDOW, 'buckets_ms': timings.BUCKETS_MS, 'views': views})
+    return render(request, 'myapp/request_stats.html', {
+        'views': views, 'window': timings.WINDOW, 'buckets_ms': timings.BUCKETS_MS,
+    })
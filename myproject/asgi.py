@@ -2,6 +2,13 @@
 ASGI config for myproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with ``uvicorn myproject.asgi:application`` and PROGRESS_SSE=1 so the
+dashboards use the progress SSE stream (``myapp.views.progress_stream``), which holds
+connections open without a worker each; the WSGI app refuses the stream.
+The polled read-only views (progress_partial, the dashboards and subject_detail) are
+async too, and every middleware is async-capable, so under this app they run on the
+event loop instead of a thread per request. ``manage.py bench_concurrency`` compares
+this app against ``gunicorn myproject.wsgi`` on the same view.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,27 @@
+"""
+Settings profiles. ``myproject.settings`` loads the one named by DJANGO_ENV:
+
+    dev   (default) DEBUG on, short-lived connections, optional debug toolbar
+    test  (default for ``manage.py test``) fast password hashing, in-memory cache,
+          no persistent connections
+    prod  DEBUG off, persistent health-checked connections, cached templates, shared cache
+
+Every profile uses ``database_url`` when it is set and a local SQLite file otherwise;
+prod only falls back to SQLite when SQLITE_PATH is set.
+A profile can also be picked directly, e.g. DJANGO_SETTINGS_MODULE=myproject.settings.prod.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILE = os.environ.get("DJANGO_ENV", "dev")
+
+if PROFILE == "dev":
+    from .dev import *  # noqa: F401,F403
+elif PROFILE == "test":
+    from .test import *  # noqa: F401,F403
+elif PROFILE == "prod":
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"Unknown DJANGO_ENV {PROFILE!r}; expected dev, test or prod")
@@ -1,5 +1,5 @@
 """
-Django settings for myproject project.
+Django settings for myproject project, shared by every profile (see __init__.py).
 
 Generated by 'django-admin startproject' using Django 5.2.8.
 
@@ -12,24 +12,25 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
+from urllib.parse import urlparse
 import dj_database_url
 from dotenv import load_dotenv
 load_dotenv()
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-# Read from environment in production; fall back to the current key for local development.
+# Read from environment; dev/test fall back to a throwaway key, prod refuses to start without one.
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
 ALLOWED_HOSTS = ['*']
 
@@ -43,16 +44,22 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "myapp.middleware.RequestTimingMiddleware",  # Server-Timing header + per-view histogram
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # Add whitenoise after security middleware
+    "myapp.middleware.StaticFilesMiddleware",  # WhiteNoise, async-capable for the ASGI app
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "myapp.roles.RoleMiddleware",  # resolves the user's roles once per request
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Only ever added by the dev profile; prod strips them even if something else adds them.
+DEBUG_ONLY_APPS = ["debug_toolbar"]
+DEBUG_ONLY_MIDDLEWARE = ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
 ROOT_URLCONF = "myproject.urls"
 
 TEMPLATES = [
@@ -79,18 +86,24 @@ WSGI_APPLICATION = "myproject.wsgi.application"
 
 
 
-DATABASES = {
-    "default": dj_database_url.parse(
-        os.environ.get("database_url"), conn_max_age=6000, ssl_require=True,
+def database(conn_max_age=0, conn_health_checks=False):
+    """The ``database_url`` database, or a local SQLite file (SQLITE_PATH) when it is unset.
+
+    SSL is only required for PostgreSQL URLs; other backends reject the sslmode option.
+    """
+    url = os.environ.get("database_url")
+    if not url:
+        return {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        }
+    return dj_database_url.parse(
+        url, conn_max_age=conn_max_age, conn_health_checks=conn_health_checks,
+        ssl_require=urlparse(url).scheme in ("postgres", "postgresql", "pgsql", "postgis"),
     )
-}
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
-#         'NAME': BASE_DIR / 'db.sqlite3',
-#     }
-# }
+
+DATABASES = {"default": database()}
 
 
 # Password validation
@@ -149,3 +162,21 @@ LOGIN_URL = "/login/student/"
 LOGIN_REDIRECT_URL = "/"
 
 LOGOUT_REDIRECT_URL = '/'
+
+# Keep a copy of the user's roles in the session (see myapp/roles.py). Only turn this
+# on with a cache shared by all workers, since group changes invalidate it via the cache.
+ROLE_SESSION_CACHE = os.environ.get("ROLE_SESSION_CACHE", "") == "1"
+
+# Per-request query/DB/template/total timings as a Server-Timing header (see
+# myapp/timings.py). The per-view histogram on the staff stats page is kept either way.
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", "1") == "1"
+
+# "sync": a topic toggle upserts every student's progress row as it happens. "deferred":
+# it only appends to the event log and queues a compaction job that writes the rows (see
+# myapp/events.py); students see toggles once `manage.py run_worker` has run it.
+PROGRESS_FANOUT = os.environ.get("PROGRESS_FANOUT", "sync")
+
+# Live dashboard progress over the SSE stream (myapp.views.progress_stream). Only turn this
+# on when serving myproject.asgi; under WSGI each stream would hold a worker, so the
+# dashboards poll progress_batch instead.
+PROGRESS_SSE = os.environ.get("PROGRESS_SSE", "") == "1"
@@ -0,0 +1,20 @@
+"""
+Development profile (the default): DJANGO_ENV=dev
+"""
+
+from importlib.util import find_spec
+
+from .base import *  # noqa: F401,F403
+from .base import DEBUG_ONLY_APPS, DEBUG_ONLY_MIDDLEWARE, INSTALLED_APPS, MIDDLEWARE, SECRET_KEY, database
+
+DEBUG = True
+
+SECRET_KEY = SECRET_KEY or "django-insecure-dev-only"
+
+# runserver threads come and go; keep connections briefly but check them before reuse
+DATABASES = {"default": database(conn_max_age=60, conn_health_checks=True)}
+
+if find_spec("debug_toolbar"):
+    INSTALLED_APPS = INSTALLED_APPS + DEBUG_ONLY_APPS
+    MIDDLEWARE = DEBUG_ONLY_MIDDLEWARE + MIDDLEWARE
+    INTERNAL_IPS = ["127.0.0.1"]
@@ -0,0 +1,72 @@
+"""
+Production profile: DJANGO_ENV=prod (or DJANGO_SETTINGS_MODULE=myproject.settings.prod)
+
+DEBUG is forced off, which also stops Django recording every query in
+connection.queries. Debug-only apps and middleware are stripped. Connections are
+persistent and health-checked, and templates are parsed once per process by the
+cached loader. It refuses to start without ``database_url``, unless SQLITE_PATH opts
+into local SQLite, which is meant for benchmarking the production configuration and
+not for serving, and without CACHE_URL: rosters, role generations and rendered
+fragments are cached, and every worker process has to see the same entries.
+"""
+
+import os
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import (DEBUG_ONLY_APPS, DEBUG_ONLY_MIDDLEWARE, INSTALLED_APPS, MIDDLEWARE, SECRET_KEY, TEMPLATES,
+                   database)
+
+DEBUG = False
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("SECRET_KEY must be set in production")
+
+# query counts and timings are internals; only send them when asked to
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", "") == "1"
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEBUG_ONLY_APPS]
+MIDDLEWARE = [m for m in MIDDLEWARE if m not in DEBUG_ONLY_MIDDLEWARE]
+
+# Reuse connections for DB_CONN_MAX_AGE seconds; health checks drop ones the server
+# or a proxy closed in the meantime instead of failing the first query on them.
+if not os.environ.get("database_url") and not os.environ.get("SQLITE_PATH"):
+    raise ImproperlyConfigured("database_url must be set in production (or SQLITE_PATH, to benchmark on SQLite)")
+
+DATABASES = {
+    "default": database(conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", 600)), conn_health_checks=True),
+}
+
+# a cache shared by every process: redis://host:6379/0 (or rediss://) or memcached://host:11211
+CACHE_BACKENDS = {
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+}
+CACHE_URL = os.environ.get("CACHE_URL", "")
+_cache_url = urlsplit(CACHE_URL)
+if _cache_url.scheme not in CACHE_BACKENDS:
+    raise ImproperlyConfigured("CACHE_URL must point at a shared Redis or Memcached cache in production")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[_cache_url.scheme],
+        "LOCATION": _cache_url.netloc if _cache_url.scheme == "memcached" else CACHE_URL,
+    },
+}
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    # loaders and APP_DIRS are mutually exclusive
+    "APP_DIRS": False,
+    "OPTIONS": {
+        **TEMPLATES[0]["OPTIONS"],
+        "loaders": [
+            ("django.template.loaders.cached.Loader", [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ]),
+        ],
+    },
+}]
@@ -0,0 +1,15 @@
+"""
+Test profile: picked by ``python manage.py test`` unless DJANGO_ENV says otherwise
+"""
+
+from .base import *  # noqa: F401,F403
+from .base import SECRET_KEY, database
+
+SECRET_KEY = SECRET_KEY or "django-insecure-test-only"
+
+DATABASES = {"default": database()}
+
+# hashing dominates user-creating tests otherwise
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}